@@ -1,5 +1,12 @@
 import csv
+import os
 import sys
+from collections import deque
+
+from degrees_graph import Graph
+from degrees_landmarks import LandmarkIndex
+from degrees_names import NameIndex
+from degrees_snapshot import fingerprint, load_snapshot, save_snapshot
 
 
 class Node:
@@ -41,6 +48,49 @@ class QueueFrontier(StackFrontier):
             return node
 
 
+class DequeStackFrontier(StackFrontier):
+    """
+    StackFrontier backed by a deque, with a count of the nodes per state
+    so that `contains_state` does not scan the frontier.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def discard_state(self, state):
+        count = self.states[state] - 1
+        if count:
+            self.states[state] = count
+        else:
+            del self.states[state]
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.pop()
+            self.discard_state(node.state)
+            return node
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.popleft()
+            self.discard_state(node.state)
+            return node
+
+
 # Maps names to a set of corresponding person_ids
 names = {}
 
@@ -50,20 +100,68 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed star graph, used instead of the "movies" and
+# "stars" sets above when data is loaded with `compact=True`
+graph = None
+
+# Landmark distance index over `graph`, see load_landmarks
+landmarks = None
+
+# Prefix and fuzzy index over `names`, built when loading with
+# `index_names=True`
+name_index = None
 
-def load_data(directory):
+
+def load_data(directory, compact=False, snapshot=False, index_names=False):
     """
     Load data from CSV files into memory.
+
+    If `compact` is true, the star relation is only stored in `graph`
+    and the `people` and `movies` dictionaries hold no sets.
+
+    If `snapshot` is true, the data is loaded compactly from a binary
+    snapshot in `directory` instead, which is (re)built from the CSV
+    files whenever it is missing or they have changed since.
+
+    If `index_names` is true, `name_index` is built for search_people.
+    """
+    global name_index
+    load_tables(directory, compact, snapshot)
+    name_index = NameIndex(names) if index_names else None
+
+
+def load_tables(directory, compact, snapshot):
+    """
+    Load people, movies and stars for load_data.
     """
+    global graph
+
+    if snapshot:
+        compact = True
+        digest = fingerprint(directory)
+        cached = load_snapshot(directory, digest)
+        if cached is not None:
+            graph, person_rows, movie_rows = cached
+            for person_id, name, birth in person_rows:
+                people[person_id] = {"name": name, "birth": birth}
+                if name.lower() not in names:
+                    names[name.lower()] = {person_id}
+                else:
+                    names[name.lower()].add(person_id)
+            for movie_id, title, year in movie_rows:
+                movies[movie_id] = {"title": title, "year": year}
+            return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             people[row["id"]] = {
                 "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+                "birth": row["birth"]
             }
+            if not compact:
+                people[row["id"]]["movies"] = set()
             if row["name"].lower() not in names:
                 names[row["name"].lower()] = {row["id"]}
             else:
@@ -75,13 +173,26 @@ def load_data(directory):
         for row in reader:
             movies[row["id"]] = {
                 "title": row["title"],
-                "year": row["year"],
-                "stars": set()
+                "year": row["year"]
             }
+            if not compact:
+                movies[row["id"]]["stars"] = set()
 
     # Load stars
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
+        if compact:
+            graph = Graph.from_stars(
+                list(people), list(movies),
+                ((row["person_id"], row["movie_id"]) for row in reader)
+            )
+            if snapshot:
+                try:
+                    save_snapshot(directory, graph, people, movies, digest)
+                except OSError:
+                    pass
+            return
+        graph = None
         for row in reader:
             try:
                 people[row["person_id"]]["movies"].add(row["movie_id"])
@@ -96,7 +207,7 @@ def main():
     directory = sys.argv[1] if len(sys.argv) == 2 else "large"
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, snapshot=True)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -121,23 +232,153 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def add_person(person_id, name, birth):
+    """
+    Add a person to the loaded data, and to `name_index` and
+    `landmarks` if built.
+    """
+    if person_id in people:
+        return
+    people[person_id] = {"name": name, "birth": birth}
+    if graph is not None:
+        graph.add_people([person_id])
+        if landmarks is not None:
+            landmarks.add_people(graph)
+    else:
+        people[person_id]["movies"] = set()
+    if name.lower() not in names:
+        names[name.lower()] = {person_id}
+    else:
+        names[name.lower()].add(person_id)
+    if name_index is not None:
+        name_index.add(name, person_id)
+
+
+def add_movie(movie_id, title, year):
+    """
+    Add a movie to the loaded data.
+    """
+    if movie_id in movies:
+        return
+    movies[movie_id] = {"title": title, "year": year}
+    if graph is not None:
+        graph.add_movies([movie_id])
+    else:
+        movies[movie_id]["stars"] = set()
+
+
+def add_stars(stars):
+    """
+    Add an iterable of (person_id, movie_id) pairs to the loaded data,
+    skipping pairs naming an unknown person or movie, and update
+    `landmarks` if loaded. With compact data, each call rewrites the
+    graph's arrays once, so stars should be added in batches.
+    """
+    if graph is None:
+        for person_id, movie_id in stars:
+            try:
+                people[person_id]["movies"].add(movie_id)
+                movies[movie_id]["stars"].add(person_id)
+            except KeyError:
+                pass
+        return
+    pairs = graph.add_stars(stars)
+    if landmarks is not None:
+        landmarks.add_links(graph, pairs)
+
+
+def load_delta(delta_directory, directory=None):
+    """
+    Add the rows of whichever of people.csv, movies.csv and stars.csv
+    exist in `delta_directory` to the loaded data.
+
+    If `directory` is given, its snapshot and landmark index are then
+    rewritten from the updated data, keyed by its current CSV files,
+    which should by now include the same rows.
+    """
+    if os.path.exists(f"{delta_directory}/people.csv"):
+        with open(f"{delta_directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                add_person(row["id"], row["name"], row["birth"])
+    if os.path.exists(f"{delta_directory}/movies.csv"):
+        with open(f"{delta_directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                add_movie(row["id"], row["title"], row["year"])
+    if os.path.exists(f"{delta_directory}/stars.csv"):
+        with open(f"{delta_directory}/stars.csv", encoding="utf-8") as f:
+            add_stars([(row["person_id"], row["movie_id"])
+                       for row in csv.DictReader(f)])
+
+    if directory is not None and graph is not None:
+        digest = fingerprint(directory)
+        save_snapshot(directory, graph, people, movies, digest)
+        if landmarks is not None:
+            landmarks.save(directory, digest)
+
+
+def load_landmarks(directory, count=16):
+    """
+    Load the landmark distance index for the data loaded from `directory`,
+    building it from `count` landmarks and saving it there if it is
+    missing or out of date. Data must have been loaded compactly.
+    """
+    global landmarks
+    if graph is None:
+        raise Exception("landmarks need data loaded with compact=True")
+    landmarks = LandmarkIndex.load(directory)
+    if landmarks is None or any(len(dist) != graph.num_people()
+                                for dist in landmarks.distances):
+        landmarks = LandmarkIndex.build(graph, count)
+        try:
+            landmarks.save(directory)
+        except OSError:
+            pass
+
+
+def separation_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    the source and the target from the landmark index, without searching.
+    Both bounds are math.inf if the two are known not to be connected.
+    """
+    return landmarks.bounds(
+        graph.person_index[source], graph.person_index[target]
+    )
+
+
+def shortest_path(source, target, bidirectional=False):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If `bidirectional` is true, searches from both the source and
+    the target at once and joins the two searches where they meet.
+    Otherwise, if landmarks are loaded, uses them to guide the search.
+
     If no possible path, returns None.
     """
+    if graph is not None:
+        if bidirectional:
+            search = graph.bidirectional_path
+        elif landmarks is not None:
+            def search(source, target):
+                return landmarks.shortest_path(graph, source, target)
+        else:
+            search = graph.shortest_path
+        path = search(graph.person_index[source], graph.person_index[target])
+        return None if path is None else graph.path_to_ids(path)
+    if bidirectional:
+        return bidirectional_path(source, target)
 
     num_explored = 0
     path = []
     start = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier()
+    frontier = DequeQueueFrontier()
     frontier.add(start)
     explored = set()
     while True:
         if frontier.empty():
-            raise Exception("None")
+            return None
         node = frontier.remove()
         num_explored += 1
         if node.state == target:
@@ -153,6 +394,78 @@ def shortest_path(source, target):
                 frontier.add(child)
 
 
+def all_shortest_paths(source, target, limit=None, timeout=None):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that connect
+    the source to the target, one at a time, including chains that differ
+    only in which shared movie links two people. Stops after `limit`
+    paths, or once `timeout` seconds have passed.
+    Data must have been loaded with `compact=True`.
+    """
+    if graph is None:
+        raise Exception("path enumeration needs data loaded with compact=True")
+    paths = graph.all_shortest_paths(
+        graph.person_index[source], graph.person_index[target],
+        limit, timeout
+    )
+    for path in paths:
+        yield graph.path_to_ids(path)
+
+
+def bidirectional_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, expanding one whole
+    breadth-first layer at a time from whichever end is smaller.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+
+    # Maps each reached person to (movie_id, person_id) it was reached from
+    forward = {source: None}
+    backward = {target: None}
+    forward_layer = [source]
+    backward_layer = [target]
+    while forward_layer and backward_layer:
+        if len(forward_layer) <= len(backward_layer):
+            reached, other, layer = forward, backward, forward_layer
+        else:
+            reached, other, layer = backward, forward, backward_layer
+        next_layer = []
+        meeting = None
+        for person_id in layer:
+            for movie_id, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id in reached:
+                    continue
+                reached[neighbor_id] = (movie_id, person_id)
+                next_layer.append(neighbor_id)
+                if meeting is None and neighbor_id in other:
+                    meeting = neighbor_id
+        if reached is forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+
+        # Every meeting found in this layer gives a path of the same length
+        if meeting is not None:
+            path = []
+            person_id = meeting
+            while forward[person_id] is not None:
+                movie_id, parent_id = forward[person_id]
+                path.append((movie_id, person_id))
+                person_id = parent_id
+            path.reverse()
+            person_id = meeting
+            while backward[person_id] is not None:
+                movie_id, parent_id = backward[person_id]
+                path.append((movie_id, parent_id))
+                person_id = parent_id
+            return path
+    return None
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -179,11 +492,32 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def search_people(query, limit=10):
+    """
+    Returns up to `limit` people whose names match `query`, as dictionaries
+    of: id, name, birth. Exact matches come first, then names with a word
+    starting with `query`, then names within a few typos of it.
+    Data must have been loaded with `index_names=True`.
+    """
+    if name_index is None:
+        raise Exception("name search needs data loaded with index_names=True")
+    return [
+        {
+            "id": person_id,
+            "name": people[person_id]["name"],
+            "birth": people[person_id]["birth"]
+        }
+        for person_id, name in name_index.search(query, limit)
+    ]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,163 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+
+
+def main():
+    if len(sys.argv) not in (4, 5):
+        sys.exit("Usage: python degrees_batch.py directory queries.csv "
+                 "output.(csv|jsonl) [workers]")
+    directory, queries_file, output_file = sys.argv[1:4]
+    workers = int(sys.argv[4]) if len(sys.argv) == 5 else 1
+
+    start = time.perf_counter()
+    degrees.load_data(directory, snapshot=True)
+    print(f"Data loaded in {time.perf_counter() - start:.2f}s.")
+
+    queries = load_queries(queries_file)
+    start = time.perf_counter()
+    results = answer_queries(queries, directory, workers)
+    elapsed = time.perf_counter() - start
+    write_results(output_file, results)
+    sources = len({result["source_id"] for result in results
+                   if result["source_id"] is not None})
+    print(f"Answered {len(results)} queries from {sources} sources "
+          f"in {elapsed:.2f}s.")
+
+
+def load_queries(filename):
+    """
+    Load (source, target) query pairs from a CSV file with `source` and
+    `target` columns, each holding a person ID or a person's name.
+    """
+    with open(filename, encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        return [(row["source"], row["target"]) for row in reader]
+
+
+def resolve_person(query):
+    """
+    Returns (person_id, error) for a person ID or name, without prompting.
+    Names shared by several people are reported as ambiguous.
+    """
+    if query in degrees.people:
+        return query, None
+    person_ids = degrees.names.get(query.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids)), None
+    elif person_ids:
+        return None, "ambiguous name"
+    return None, "person not found"
+
+
+def answer_queries(queries, directory, workers=1):
+    """
+    Answers every (source, target) query, running one breadth-first
+    search per distinct source. With more than one worker, sources are
+    spread across a process pool that loads `directory` on its own.
+
+    Returns one result dictionary per query, in order.
+    """
+    results = []
+    groups = {}
+    for source, target in queries:
+        source_id, source_error = resolve_person(source)
+        target_id, target_error = resolve_person(target)
+        result = {
+            "source": source,
+            "target": target,
+            "source_id": source_id,
+            "target_id": target_id,
+            "degrees": None,
+            "path": None,
+            "error": source_error or target_error
+        }
+        results.append(result)
+        if result["error"] is None:
+            groups.setdefault(source_id, set()).add(target_id)
+
+    sources = list(groups)
+    if workers > 1 and len(sources) > 1:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=init_worker,
+                                 initargs=(directory,)) as executor:
+            answers = executor.map(
+                answer_group, sources, [groups[s] for s in sources],
+                chunksize=max(1, len(sources) // (workers * 4))
+            )
+            paths = dict(zip(sources, answers))
+    else:
+        paths = {source: answer_group(source, groups[source])
+                 for source in sources}
+
+    for result in results:
+        if result["error"] is not None:
+            continue
+        path = paths[result["source_id"]][result["target_id"]]
+        if path is None:
+            result["error"] = "not connected"
+        else:
+            result["degrees"] = len(path)
+            result["path"] = path
+    return results
+
+
+def init_worker(directory):
+    """
+    Loads the dataset in a pool worker, unless it was inherited already.
+    """
+    if degrees.graph is None:
+        degrees.load_data(directory, snapshot=True)
+
+
+def answer_group(source_id, target_ids):
+    """
+    Returns a dictionary mapping each of `target_ids` to the shortest
+    list of (movie_id, person_id) pairs from `source_id`, or to None.
+    """
+    graph = degrees.graph
+    paths = graph.shortest_paths(
+        graph.person_index[source_id],
+        [graph.person_index[target_id] for target_id in target_ids]
+    )
+    return {
+        graph.person_ids[target]: (
+            None if path is None else graph.path_to_ids(path)
+        )
+        for target, path in paths.items()
+    }
+
+
+def write_results(filename, results):
+    """
+    Writes query results as JSON lines if `filename` ends in .jsonl,
+    otherwise as CSV with each path written as movie_id:person_id steps.
+    """
+    with open(filename, "w", encoding="utf-8", newline="") as f:
+        if os.path.splitext(filename)[1] == ".jsonl":
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+            return
+        writer = csv.writer(f)
+        writer.writerow(["source", "target", "source_id", "target_id",
+                         "degrees", "path", "error"])
+        for result in results:
+            path = result["path"]
+            writer.writerow([
+                result["source"], result["target"],
+                result["source_id"], result["target_id"],
+                result["degrees"],
+                None if path is None else " ".join(
+                    f"{movie_id}:{person_id}" for movie_id, person_id in path
+                ),
+                result["error"]
+            ])
+
+
+if __name__ == "__main__":
+    main()
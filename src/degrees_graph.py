@@ -0,0 +1,577 @@
+import itertools
+import time
+from array import array
+from collections import deque
+
+# Distance stored for people not connected to the search's source
+UNREACHABLE = 255
+
+# Co-stars a search scans between checks of its deadline
+DEADLINE_INTERVAL = 4096
+
+
+class Graph():
+    """
+    Compact representation of the people/movies star graph.
+
+    Every person and movie is interned to a consecutive integer index.
+    The bipartite star relation is stored twice in CSR form: the movies
+    of person `p` are `person_movies[person_offsets[p]:person_offsets[p + 1]]`
+    and the stars of movie `m` are
+    `movie_stars[movie_offsets[m]:movie_offsets[m + 1]]`.
+
+    Searches run on the co-star adjacency, also in CSR form: the people
+    who starred with `p` are
+    `costar_people[costar_offsets[p]:costar_offsets[p + 1]]`, and
+    `costar_movies` holds one movie they share at the same positions.
+    """
+
+    def __init__(self, person_ids, movie_ids,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 costar_offsets=None, costar_people=None, costar_movies=None):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        self.person_index = {
+            person_id: i for i, person_id in enumerate(person_ids)
+        }
+        self.movie_index = {
+            movie_id: i for i, movie_id in enumerate(movie_ids)
+        }
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        if costar_offsets is None:
+            costar_offsets, costar_people, costar_movies = self.costars()
+        self.costar_offsets = costar_offsets
+        self.costar_people = costar_people
+        self.costar_movies = costar_movies
+
+    @classmethod
+    def from_stars(cls, person_ids, movie_ids, stars):
+        """
+        Build a graph from lists of person and movie IDs and an iterable
+        of (person_id, movie_id) star pairs.
+        Pairs naming an unknown person or movie are skipped,
+        and duplicate pairs are stored once.
+        """
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+        num_people = len(person_ids)
+        num_movies = len(movie_ids)
+
+        # Encode each edge as one integer so sorting groups them by person
+        keys = array("q")
+        for person_id, movie_id in stars:
+            try:
+                key = (person_index[person_id] * num_movies
+                       + movie_index[movie_id])
+            except KeyError:
+                continue
+            keys.append(key)
+        keys = sorted(set(keys))
+
+        # Person -> movies rows come straight out of the sorted keys
+        person_offsets = array("q", [0]) * (num_people + 1)
+        person_movies = array("i", [0]) * len(keys)
+        movie_counts = array("q", [0]) * (num_movies + 1)
+        for i, key in enumerate(keys):
+            person, movie = divmod(key, num_movies)
+            person_offsets[person + 1] += 1
+            person_movies[i] = movie
+            movie_counts[movie + 1] += 1
+        for person in range(num_people):
+            person_offsets[person + 1] += person_offsets[person]
+
+        # Movie -> stars rows are filled in with a counting sort
+        for movie in range(num_movies):
+            movie_counts[movie + 1] += movie_counts[movie]
+        movie_offsets = array("q", movie_counts)
+        movie_stars = array("i", [0]) * len(keys)
+        for key in keys:
+            person, movie = divmod(key, num_movies)
+            movie_stars[movie_counts[movie]] = person
+            movie_counts[movie] += 1
+
+        return cls(list(person_ids), list(movie_ids),
+                   person_offsets, person_movies, movie_offsets, movie_stars)
+
+    def costars(self):
+        """
+        Collapses the bipartite star relation into co-star CSR arrays,
+        keeping each pair of co-stars once, through the first movie
+        they share, and leaving out each person's link to themselves.
+        Returns (costar_offsets, costar_people, costar_movies).
+        """
+        costar_offsets = array("q", [0]) * (len(self.person_ids) + 1)
+        costar_people = array("i")
+        costar_movies = array("i")
+        for person in range(len(self.person_ids)):
+            shared = {person: None}
+            for movie in self.movies_of(person):
+                for star in self.stars_of(movie):
+                    if star not in shared:
+                        shared[star] = movie
+                        costar_people.append(star)
+                        costar_movies.append(movie)
+            costar_offsets[person + 1] = len(costar_people)
+        return costar_offsets, costar_people, costar_movies
+
+    def add_people(self, person_ids):
+        """
+        Adds people who are not in the graph yet, with no movies.
+        """
+        for person_id in person_ids:
+            if person_id in self.person_index:
+                continue
+            self.person_index[person_id] = len(self.person_ids)
+            self.person_ids.append(person_id)
+            self.person_offsets = writable(self.person_offsets)
+            self.person_offsets.append(self.person_offsets[-1])
+            self.costar_offsets = writable(self.costar_offsets)
+            self.costar_offsets.append(self.costar_offsets[-1])
+
+    def add_movies(self, movie_ids):
+        """
+        Adds movies that are not in the graph yet, with no stars.
+        """
+        for movie_id in movie_ids:
+            if movie_id in self.movie_index:
+                continue
+            self.movie_index[movie_id] = len(self.movie_ids)
+            self.movie_ids.append(movie_id)
+            self.movie_offsets = writable(self.movie_offsets)
+            self.movie_offsets.append(self.movie_offsets[-1])
+
+    def add_stars(self, stars):
+        """
+        Adds an iterable of (person_id, movie_id) star pairs, skipping pairs
+        naming an unknown person or movie and pairs already in the graph.
+
+        The new entries are spliced into the CSR arrays in one pass that
+        copies the unchanged runs between them, so add stars in batches.
+        Returns the (person, person) index pairs that became co-stars.
+        """
+        added_movies = {}
+        added_stars = {}
+        for person_id, movie_id in stars:
+            person = self.person_index.get(person_id)
+            movie = self.movie_index.get(movie_id)
+            if person is None or movie is None:
+                continue
+            if (movie in self.movies_of(person)
+                    or movie in added_movies.get(person, ())):
+                continue
+            added_movies.setdefault(person, []).append(movie)
+            added_stars.setdefault(movie, []).append(person)
+
+        # Link each new star to the rest of the movie's cast, old and new
+        added_costars = {}
+        pairs = []
+        for movie, cast in added_stars.items():
+            stars = list(self.stars_of(movie)) + cast
+            for person in cast:
+                for star in stars:
+                    if star == person:
+                        continue
+                    for a, b in ((person, star), (star, person)):
+                        linked = added_costars.setdefault(a, {})
+                        if b in linked or b in self.costars_of(a):
+                            continue
+                        linked[b] = movie
+                        if a < b:
+                            pairs.append((a, b))
+
+        self.person_offsets, (self.person_movies,) = splice(
+            self.person_offsets, [self.person_movies],
+            {person: [(movie,) for movie in movies]
+             for person, movies in added_movies.items()}
+        )
+        self.movie_offsets, (self.movie_stars,) = splice(
+            self.movie_offsets, [self.movie_stars],
+            {movie: [(person,) for person in cast]
+             for movie, cast in added_stars.items()}
+        )
+        self.costar_offsets, (self.costar_people, self.costar_movies) = splice(
+            self.costar_offsets, [self.costar_people, self.costar_movies],
+            {person: list(linked.items())
+             for person, linked in added_costars.items() if linked}
+        )
+        return pairs
+
+    def num_people(self):
+        return len(self.person_ids)
+
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    def movies_of(self, person):
+        """Returns the movie indices person index `person` starred in."""
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]
+        ]
+
+    def stars_of(self, movie):
+        """Returns the person indices who starred in movie index `movie`."""
+        return self.movie_stars[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+        ]
+
+    def costars_of(self, person):
+        """Returns the person indices who starred with person index `person`."""
+        return self.costar_people[
+            self.costar_offsets[person]:self.costar_offsets[person + 1]
+        ]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people who starred
+        with person index `person`.
+        """
+        for movie in self.movies_of(person):
+            for star in self.stars_of(movie):
+                yield movie, star
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        return {
+            (self.movie_ids[movie], self.person_ids[star])
+            for movie, star in self.neighbors(self.person_index[person_id])
+        }
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie, person) index pairs
+        that connect person index `source` to person index `target`.
+
+        If no possible path, returns None.
+        """
+        if source == target:
+            return []
+        costar_offsets = self.costar_offsets
+        costar_people = self.costar_people
+        costar_movies = self.costar_movies
+
+        # parent[p] is the person p was reached from, -1 if unexplored
+        parent = array("i", [-1]) * len(self.person_ids)
+        via = array("i", [-1]) * len(self.person_ids)
+        parent[source] = source
+        queue = deque([source])
+        while queue:
+            person = queue.popleft()
+            for i in range(costar_offsets[person], costar_offsets[person + 1]):
+                star = costar_people[i]
+                if parent[star] != -1:
+                    continue
+                parent[star] = person
+                via[star] = costar_movies[i]
+                if star == target:
+                    return self.trace_path(parent, via, source, target)
+                queue.append(star)
+        return None
+
+    def shortest_paths(self, source, targets):
+        """
+        Returns a dictionary mapping each person index in `targets` to the
+        shortest list of (movie, person) index pairs that connects person
+        index `source` to it, or to None if there is no possible path.
+
+        A single breadth-first search from `source` answers every target,
+        stopping as soon as the last one is reached.
+        """
+        remaining = set(targets)
+        paths = {}
+        if source in remaining:
+            paths[source] = []
+            remaining.discard(source)
+        if not remaining:
+            return paths
+        costar_offsets = self.costar_offsets
+        costar_people = self.costar_people
+        costar_movies = self.costar_movies
+
+        parent = array("i", [-1]) * len(self.person_ids)
+        via = array("i", [-1]) * len(self.person_ids)
+        parent[source] = source
+        queue = deque([source])
+        while queue and remaining:
+            person = queue.popleft()
+            for i in range(costar_offsets[person], costar_offsets[person + 1]):
+                star = costar_people[i]
+                if parent[star] != -1:
+                    continue
+                parent[star] = person
+                via[star] = costar_movies[i]
+                queue.append(star)
+                if star in remaining:
+                    remaining.discard(star)
+                    paths[star] = self.trace_path(parent, via, source, star)
+        for target in remaining:
+            paths[target] = None
+        return paths
+
+    def all_shortest_paths(self, source, target, limit=None, timeout=None):
+        """
+        Yields every shortest list of (movie, person) index pairs that
+        connects person index `source` to person index `target`, counting
+        chains through different shared movies as different paths.
+
+        A breadth-first search records every parent of each person up to
+        the target's layer, then paths are generated lazily by walking the
+        parents back from the target. Stops after `limit` paths, or once
+        `timeout` seconds have passed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if limit == 0:
+            return
+        if source == target:
+            yield []
+            return
+        costar_offsets = self.costar_offsets
+        costar_people = self.costar_people
+
+        dist = array("i", [-1]) * len(self.person_ids)
+        dist[source] = 0
+        parents = {source: []}
+        layer = [source]
+        scanned = 0
+        while layer and dist[target] == -1:
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            depth = dist[layer[0]] + 1
+            next_layer = []
+            for person in layer:
+                start = costar_offsets[person]
+                end = costar_offsets[person + 1]
+                while start < end:
+
+                    # A layer, or even one person's co-stars, can number
+                    # hundreds of thousands, so the deadline is checked
+                    # as they are scanned
+                    stop = min(end, start + DEADLINE_INTERVAL)
+                    scanned += stop - start
+                    if deadline is not None and scanned >= DEADLINE_INTERVAL:
+                        scanned = 0
+                        if time.monotonic() > deadline:
+                            return
+                    for i in range(start, stop):
+                        star = costar_people[i]
+                        if dist[star] == -1:
+                            dist[star] = depth
+                            parents[star] = [person]
+                            next_layer.append(star)
+                        elif dist[star] == depth:
+                            parents[star].append(person)
+                    start = stop
+            layer = next_layer
+        if dist[target] == -1:
+            return
+
+        def chains(person):
+            """Yields each chain of people from `source` to `person`."""
+            if person == source:
+                yield [source]
+                return
+            for parent in parents[person]:
+                for chain in chains(parent):
+                    chain.append(person)
+                    yield chain
+
+        count = 0
+        for chain in chains(target):
+            hops = [
+                [(movie, chain[i + 1])
+                 for movie in self.shared_movies(chain[i], chain[i + 1])]
+                for i in range(len(chain) - 1)
+            ]
+            for path in itertools.product(*hops):
+                if deadline is not None and time.monotonic() > deadline:
+                    return
+                yield list(path)
+                count += 1
+                if count == limit:
+                    return
+
+    def shared_movies(self, person, other):
+        """
+        Returns the sorted movie indices both person indices starred in.
+        """
+        return sorted(set(self.movies_of(person)) & set(self.movies_of(other)))
+
+    def distances(self, source):
+        """
+        Returns a bytearray holding the degrees of separation between
+        person index `source` and every person, or UNREACHABLE for people
+        not connected to `source`.
+        """
+        costar_offsets = self.costar_offsets
+        costar_people = self.costar_people
+
+        dist = bytearray([UNREACHABLE]) * len(self.person_ids)
+        dist[source] = 0
+        layer = [source]
+        depth = 0
+        while layer:
+            depth += 1
+            if depth >= UNREACHABLE:
+                raise Exception("graph too deep for byte distances")
+            next_layer = []
+            for person in layer:
+                for i in range(costar_offsets[person],
+                               costar_offsets[person + 1]):
+                    star = costar_people[i]
+                    if dist[star] == UNREACHABLE:
+                        dist[star] = depth
+                        next_layer.append(star)
+            layer = next_layer
+        return dist
+
+    def bidirectional_path(self, source, target):
+        """
+        Returns the shortest list of (movie, person) index pairs
+        that connect person index `source` to person index `target`,
+        growing breadth-first frontiers from both ends until they meet.
+
+        If no possible path, returns None.
+        """
+        if source == target:
+            return []
+        num_people = len(self.person_ids)
+        sides = []
+        for start in (source, target):
+            dist = array("i", [-1]) * num_people
+            dist[start] = 0
+            sides.append({
+                "dist": dist,
+                "parent": array("i", [-1]) * num_people,
+                "via": array("i", [-1]) * num_people,
+                "layer": [start]
+            })
+        forward, backward = sides
+
+        while forward["layer"] and backward["layer"]:
+
+            # Always grow the side with the smaller frontier
+            if len(forward["layer"]) <= len(backward["layer"]):
+                side, other = forward, backward
+            else:
+                side, other = backward, forward
+            meeting = self.expand_layer(side, other["dist"])
+            if meeting is not None:
+                return self.join_paths(forward, backward, meeting)
+        return None
+
+    def expand_layer(self, side, other_dist):
+        """
+        Expands every person in `side["layer"]` by one step, replacing it
+        with the next layer. Returns the first newly reached person who
+        has already been reached from the other side, otherwise None.
+        """
+        costar_offsets = self.costar_offsets
+        costar_people = self.costar_people
+        costar_movies = self.costar_movies
+        dist = side["dist"]
+        parent = side["parent"]
+        via = side["via"]
+
+        next_layer = []
+        for person in side["layer"]:
+            depth = dist[person] + 1
+            for i in range(costar_offsets[person], costar_offsets[person + 1]):
+                star = costar_people[i]
+                if dist[star] != -1:
+                    continue
+                dist[star] = depth
+                parent[star] = person
+                via[star] = costar_movies[i]
+
+                # Layers are expanded whole, so the first meeting
+                # already lies on a shortest path
+                if other_dist[star] != -1:
+                    return star
+                next_layer.append(star)
+        side["layer"] = next_layer
+        return None
+
+    def join_paths(self, forward, backward, meeting):
+        """
+        Joins the forward search's path to `meeting` with the backward
+        search's path from `meeting` into one (movie, person) index path.
+        """
+        path = []
+        person = meeting
+        while forward["dist"][person] != 0:
+            path.append((forward["via"][person], person))
+            person = forward["parent"][person]
+        path.reverse()
+        person = meeting
+        while backward["dist"][person] != 0:
+            path.append((backward["via"][person], backward["parent"][person]))
+            person = backward["parent"][person]
+        return path
+
+    @staticmethod
+    def trace_path(parent, via, source, target):
+        """
+        Follows `parent`/`via` links back from `target` to `source`
+        and returns the (movie, person) index pairs in order.
+        """
+        path = []
+        person = target
+        while person != source:
+            path.append((via[person], person))
+            person = parent[person]
+        path.reverse()
+        return path
+
+    def path_to_ids(self, path):
+        """Converts (movie, person) index pairs into IMDb ID pairs."""
+        return [
+            (self.movie_ids[movie], self.person_ids[person])
+            for movie, person in path
+        ]
+
+
+def writable(values):
+    """
+    Returns `values` as an array, copying read-only views such as
+    the memory-mapped arrays of a snapshot.
+    """
+    if isinstance(values, array):
+        return values
+    return array(values.format, values)
+
+
+def splice(offsets, columns, additions):
+    """
+    Appends entries to rows of CSR arrays that share `offsets`.
+    `additions` maps a row to a list of entries, each a tuple with one value
+    per array in `columns`. Returns the new offsets and list of arrays.
+    """
+    if not additions:
+        return offsets, columns
+    new_offsets = array("q", offsets)
+    new_columns = [array(memoryview(column).format) for column in columns]
+    rows = sorted(additions)
+    start = 0
+    shift = 0
+    for k, row in enumerate(rows):
+
+        # Copy the unchanged run up to the end of this row in bulk
+        end = offsets[row + 1]
+        for column, new_column in zip(columns, new_columns):
+            new_column.frombytes(memoryview(column)[start:end].cast("B"))
+        for entry in additions[row]:
+            for value, new_column in zip(entry, new_columns):
+                new_column.append(value)
+        start = end
+        shift += len(additions[row])
+        following = rows[k + 1] if k + 1 < len(rows) else len(offsets) - 1
+        for later in range(row + 1, following + 1):
+            new_offsets[later] += shift
+    for column, new_column in zip(columns, new_columns):
+        new_column.frombytes(memoryview(column)[start:].cast("B"))
+    return new_offsets, new_columns
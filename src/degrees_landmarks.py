@@ -0,0 +1,224 @@
+import heapq
+import math
+import mmap
+import os
+import struct
+from array import array
+from collections import deque
+
+from degrees_graph import UNREACHABLE
+from degrees_snapshot import fingerprint
+
+LANDMARKS_NAME = "degrees.landmarks"
+MAGIC = b"DEGLMK01"
+
+# Magic, source fingerprint, number of landmarks, number of people
+HEADER = struct.Struct("=8s32sII")
+
+
+class LandmarkIndex():
+    """
+    Precomputed degrees of separation from a few landmark people to
+    everyone else. By the triangle inequality, for any landmark L,
+    |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t).
+    """
+
+    def __init__(self, landmarks, distances):
+        """
+        `landmarks` is a list of person indices and `distances` a list of
+        matching byte sequences indexed by person.
+        """
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, count=16):
+        """
+        Picks up to `count` landmarks among the people who starred in the
+        most movies, skipping anyone within one degree of a landmark
+        already picked, and runs a breadth-first search from each.
+        """
+        people = sorted(
+            range(graph.num_people()),
+            key=lambda person: (graph.person_offsets[person + 1]
+                                - graph.person_offsets[person]),
+            reverse=True
+        )
+        landmarks = []
+        distances = []
+        for person in people:
+            if len(landmarks) == count:
+                break
+            if any(dist[person] <= 1 for dist in distances):
+                continue
+            landmarks.append(person)
+            distances.append(graph.distances(person))
+        return cls(landmarks, distances)
+
+    def save(self, directory, digest=None):
+        """
+        Writes the index to a file in `directory`, keyed by `digest`,
+        the fingerprint of the source CSVs the graph was loaded from.
+        """
+        if digest is None:
+            digest = fingerprint(directory)
+        path = os.path.join(directory, LANDMARKS_NAME)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        num_people = len(self.distances[0]) if self.distances else 0
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(MAGIC, digest, len(self.landmarks),
+                                num_people))
+            array("i", self.landmarks).tofile(f)
+            for dist in self.distances:
+                f.write(dist)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, directory, digest=None):
+        """
+        Loads the index in `directory` if it is keyed by `digest`, by
+        default the current fingerprint of the source CSVs, memory-mapping
+        the distances. Returns None if there is no usable index.
+        """
+        if digest is None:
+            digest = fingerprint(directory)
+        path = os.path.join(directory, LANDMARKS_NAME)
+        try:
+            with open(path, "rb") as f:
+                contents = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, stored, count, num_people = HEADER.unpack_from(contents, 0)
+        except (OSError, ValueError, struct.error):
+            return None
+        start = HEADER.size + 4 * count
+        if (magic != MAGIC or stored != digest
+                or len(contents) != start + count * num_people):
+            return None
+        view = memoryview(contents)
+        landmarks = list(view[HEADER.size:start].cast("i"))
+        distances = [
+            view[start + i * num_people:start + (i + 1) * num_people]
+            for i in range(count)
+        ]
+        return cls(landmarks, distances)
+
+    def add_people(self, graph):
+        """
+        Adds the people added to `graph` since the index was built, who
+        no landmark can reach until they are linked to someone.
+        """
+        self.distances = [bytearray(dist) for dist in self.distances]
+        for dist in self.distances:
+            dist.extend([UNREACHABLE] * (graph.num_people() - len(dist)))
+
+    def add_links(self, graph, pairs):
+        """
+        Updates the distances for people added to `graph` since the index
+        was built and for `pairs` of person indices who just became
+        co-stars. New links can only shorten distances, so each one that
+        does is relaxed outward from the person it brings closer.
+        """
+        self.add_people(graph)
+        costar_offsets = graph.costar_offsets
+        costar_people = graph.costar_people
+        for dist in self.distances:
+            for a, b in pairs:
+                for near, far in ((a, b), (b, a)):
+                    if dist[near] + 1 >= dist[far]:
+                        continue
+                    dist[far] = dist[near] + 1
+                    queue = deque([far])
+                    while queue:
+                        person = queue.popleft()
+                        depth = dist[person] + 1
+                        for i in range(costar_offsets[person],
+                                       costar_offsets[person + 1]):
+                            star = costar_people[i]
+                            if depth < dist[star]:
+                                dist[star] = depth
+                                queue.append(star)
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        person indices `source` and `target`. Both are math.inf when the
+        index proves the two are not connected, and upper is math.inf when
+        no landmark is connected to them.
+        """
+        if source == target:
+            return 0, 0
+        lower = 1
+        upper = math.inf
+        for dist in self.distances:
+            source_dist = dist[source]
+            target_dist = dist[target]
+            if source_dist == UNREACHABLE and target_dist == UNREACHABLE:
+                continue
+            if source_dist == UNREACHABLE or target_dist == UNREACHABLE:
+                return math.inf, math.inf
+            lower = max(lower, abs(source_dist - target_dist))
+            upper = min(upper, source_dist + target_dist)
+        return lower, upper
+
+    def shortest_path(self, graph, source, target):
+        """
+        Returns the shortest list of (movie, person) index pairs that
+        connect person index `source` to `target` in `graph`, using A*
+        search with landmark lower bounds as the heuristic (ALT).
+
+        If no possible path, returns None.
+        """
+        if source == target:
+            return []
+        lower, upper = self.bounds(source, target)
+        if lower == math.inf:
+            return None
+
+        # Only landmarks connected to the target give a usable bound
+        targets = [
+            (dist, dist[target]) for dist in self.distances
+            if dist[target] != UNREACHABLE
+        ]
+
+        def heuristic(person):
+            best = 0
+            for dist, target_dist in targets:
+                person_dist = dist[person]
+                if person_dist != UNREACHABLE:
+                    best = max(best, abs(person_dist - target_dist))
+            return best
+
+        costar_offsets = graph.costar_offsets
+        costar_people = graph.costar_people
+        costar_movies = graph.costar_movies
+
+        depth = array("i", [-1]) * graph.num_people()
+        parent = array("i", [-1]) * graph.num_people()
+        via = array("i", [-1]) * graph.num_people()
+        depth[source] = 0
+        parent[source] = source
+
+        # Ties on the estimate go to the deepest person, nearest the target
+        frontier = [(heuristic(source), 0, source)]
+        while frontier:
+            estimate, person_depth, person = heapq.heappop(frontier)
+            person_depth = -person_depth
+            if person_depth != depth[person]:
+                continue
+            if person == target:
+                return graph.trace_path(parent, via, source, target)
+            star_depth = person_depth + 1
+            for i in range(costar_offsets[person], costar_offsets[person + 1]):
+                star = costar_people[i]
+                if depth[star] != -1 and depth[star] <= star_depth:
+                    continue
+
+                # Nobody estimated past the upper bound can be on
+                # a shortest path
+                estimate = star_depth + heuristic(star)
+                if estimate > upper:
+                    continue
+                depth[star] = star_depth
+                parent[star] = person
+                via[star] = costar_movies[i]
+                heapq.heappush(frontier, (estimate, -star_depth, star))
+        return None
@@ -0,0 +1,233 @@
+import bisect
+from array import array
+from collections import Counter
+
+
+class NameIndex():
+    """
+    Index over people's names for prefix and typo-tolerant lookup.
+
+    Every name is stored once, lowercased, and new names can be added
+    after the index is built. Prefix lookups bisect a sorted
+    list of every word-start suffix of every name, so "han" finds both
+    "hank azaria" and "tom hanks". Fuzzy lookups count the trigrams a
+    query shares with names through its rarest trigrams, and keep those
+    within a few edits, closest first.
+    """
+
+    # Most candidates kept from each stage before ranking
+    PREFIX_SCAN = 1000
+    FUZZY_POOL = 200
+    FUZZY_CANDIDATES = 50
+
+    # Most trigram postings a fuzzy lookup reads
+    FUZZY_SCAN = 20000
+
+    def __init__(self, names):
+        """
+        Builds the index from `names`, a dictionary mapping
+        lowercase names to a set of person IDs.
+        """
+        self.names = sorted(names)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.person_ids = [sorted(names[name]) for name in self.names]
+
+        suffixes = []
+        for i, name in enumerate(self.names):
+            start = 0
+            while start != -1:
+                suffixes.append((name[start:], i))
+                start = name.find(" ", start)
+                if start != -1:
+                    start += 1
+        suffixes.sort()
+        self.suffixes = [suffix for suffix, i in suffixes]
+        self.suffix_names = array("i", (i for suffix, i in suffixes))
+
+        postings = {}
+        for i, name in enumerate(self.names):
+            for trigram in trigrams(name):
+                posting = postings.get(trigram)
+                if posting is None:
+                    posting = postings[trigram] = array("i")
+                posting.append(i)
+        self.trigrams = postings
+
+    def add(self, name, person_id):
+        """
+        Adds a person to the index under `name`.
+        """
+        name = name.lower()
+        i = self.positions.get(name)
+        if i is not None:
+            if person_id not in self.person_ids[i]:
+                bisect.insort(self.person_ids[i], person_id)
+            return
+
+        # New names go at the end so existing postings stay valid
+        i = len(self.names)
+        self.names.append(name)
+        self.positions[name] = i
+        self.person_ids.append([person_id])
+        start = 0
+        while start != -1:
+            position = bisect.bisect_left(self.suffixes, name[start:])
+            self.suffixes.insert(position, name[start:])
+            self.suffix_names.insert(position, i)
+            start = name.find(" ", start)
+            if start != -1:
+                start += 1
+        for trigram in trigrams(name):
+            posting = self.trigrams.get(trigram)
+            if posting is None:
+                posting = self.trigrams[trigram] = array("i")
+            posting.append(i)
+
+    def search(self, query, limit=10):
+        """
+        Returns up to `limit` (person_id, name) pairs for names matching
+        `query`: exact matches first, then names with a word starting with
+        `query`, shortest first, then the closest names by edit distance.
+        """
+        query = " ".join(query.lower().split())
+        if not query:
+            return []
+        ranked = []
+        seen = set()
+
+        def take(i):
+            if i not in seen:
+                seen.add(i)
+                ranked.append(i)
+
+        if query in self.positions:
+            take(self.positions[query])
+        for i in self.prefix_matches(query):
+            take(i)
+        if len(self.expand(ranked, limit)) < limit:
+            for i in self.fuzzy_matches(query):
+                take(i)
+        return self.expand(ranked, limit)
+
+    def expand(self, ranked, limit):
+        """
+        Returns up to `limit` (person_id, name) pairs for
+        the name indices in `ranked`, in order.
+        """
+        results = []
+        for i in ranked:
+            for person_id in self.person_ids[i]:
+                if len(results) == limit:
+                    return results
+                results.append((person_id, self.names[i]))
+        return results
+
+    def prefix_matches(self, query):
+        """
+        Returns the indices of names with a word starting with `query`,
+        whole-name prefixes first, then shortest first.
+        """
+        start = bisect.bisect_left(self.suffixes, query)
+        matches = set()
+        for position in range(start, len(self.suffixes)):
+            if (not self.suffixes[position].startswith(query)
+                    or len(matches) == self.PREFIX_SCAN):
+                break
+            matches.add(self.suffix_names[position])
+        return sorted(matches, key=lambda i: (
+            not self.names[i].startswith(query), len(self.names[i]),
+            self.names[i]
+        ))
+
+    def fuzzy_matches(self, query):
+        """
+        Returns the indices of the names within `max_edits(query)` edits
+        of `query`, or with a word starting such a suffix, closest by
+        edit distance first.
+
+        A name that close shares all but a few of the query's trigrams,
+        so it must share one of the rarest few: only their postings are
+        scanned, at most FUZZY_SCAN of them, and the names sharing the
+        most are checked for their edit distance.
+        """
+        edits = max_edits(query)
+        query_trigrams = sorted(
+            trigrams(query), key=lambda trigram: len(self.trigrams.get(
+                trigram, ()
+            ))
+        )
+
+        # Each edit removes at most three trigrams, and a suffix match
+        # also loses the query's leading trigram
+        shared = Counter()
+        budget = self.FUZZY_SCAN
+        for trigram in query_trigrams[:3 * edits + 2]:
+            posting = self.trigrams.get(trigram, ())[:budget]
+            shared.update(posting)
+            budget -= len(posting)
+            if budget == 0:
+                break
+
+        candidates = []
+        for i, count in shared.most_common(self.FUZZY_POOL):
+            distance = name_distance(query, self.names[i], edits)
+            if distance <= edits:
+                candidates.append((distance, self.names[i], i))
+        candidates.sort()
+        return [i for distance, name, i in candidates[:self.FUZZY_CANDIDATES]]
+
+
+def trigrams(name):
+    """
+    Returns the set of three-character substrings of `name`,
+    padded with spaces so that word boundaries count.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit=None):
+    """
+    Returns the Levenshtein distance between strings `a` and `b`. With
+    a `limit`, stops early once the distance must exceed it, and returns
+    some distance above `limit` instead.
+    """
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        previous = current
+        if limit is not None and min(previous) > limit:
+            return min(previous)
+    return previous[-1]
+
+
+def max_edits(query):
+    """
+    Returns the most edits a fuzzy match for `query` may be away from
+    it: one for every four characters, and at least one.
+    """
+    return max(1, len(query) // 4)
+
+
+def name_distance(query, name, limit):
+    """
+    Returns the edit distance between `query` and the closer of `name`
+    and its word-start suffixes, skipping those whose length alone puts
+    them more than `limit` edits away.
+    """
+    best = limit + 1
+    start = 0
+    while start != -1:
+        suffix = name[start:]
+        if abs(len(suffix) - len(query)) < best:
+            best = min(best, edit_distance(query, suffix, best - 1))
+        start = name.find(" ", start)
+        if start != -1:
+            start += 1
+    return best
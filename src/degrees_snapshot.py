@@ -0,0 +1,92 @@
+import hashlib
+import os
+from array import array
+
+from degrees_graph import Graph
+from sectioned_file import read_sections, write_sections
+
+SNAPSHOT_NAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+MAGIC = b"DEGSNAP3"
+
+GRAPH_SECTIONS = (
+    "person_offsets", "person_movies", "movie_offsets", "movie_stars",
+    "costar_offsets", "costar_people", "costar_movies"
+)
+TEXT_SECTIONS = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years"
+)
+
+
+def fingerprint(directory):
+    """
+    Returns a digest of the size and modification time of each source CSV
+    in `directory`, which changes whenever any of them is rewritten.
+    """
+    digest = hashlib.sha256()
+    for filename in SOURCES:
+        stat = os.stat(os.path.join(directory, filename))
+        digest.update(f"{filename}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.digest()
+
+
+def save_snapshot(directory, graph, people, movies, digest=None):
+    """
+    Writes `graph` and the name/birth and title/year of every person and
+    movie in it to a snapshot file in `directory`, keyed by `digest`,
+    the fingerprint of the source CSVs the data was loaded from.
+    """
+    if digest is None:
+        digest = fingerprint(directory)
+    sections = {
+        "person_offsets": graph.person_offsets,
+        "person_movies": graph.person_movies,
+        "movie_offsets": graph.movie_offsets,
+        "movie_stars": graph.movie_stars,
+        "costar_offsets": graph.costar_offsets,
+        "costar_people": graph.costar_people,
+        "costar_movies": graph.costar_movies,
+        "person_ids": graph.person_ids,
+        "person_names": [people[i]["name"] for i in graph.person_ids],
+        "person_births": [people[i]["birth"] for i in graph.person_ids],
+        "movie_ids": graph.movie_ids,
+        "movie_titles": [movies[i]["title"] for i in graph.movie_ids],
+        "movie_years": [movies[i]["year"] for i in graph.movie_ids]
+    }
+
+    for name in GRAPH_SECTIONS:
+        if not isinstance(sections[name], array):
+            sections[name] = array(sections[name].format, sections[name])
+    for name in TEXT_SECTIONS:
+        sections[name] = list(sections[name])
+    write_sections(os.path.join(directory, SNAPSHOT_NAME), MAGIC, digest,
+                   sections)
+
+
+def load_snapshot(directory, digest=None):
+    """
+    Loads the snapshot in `directory` if it is keyed by `digest`,
+    by default the current fingerprint of the source CSVs.
+
+    Returns a (graph, people, movies) tuple, where `people` is a list of
+    (id, name, birth) rows and `movies` a list of (id, title, year) rows,
+    or None if there is no usable snapshot. The graph's CSR arrays are
+    read-only views into the memory-mapped file.
+    """
+    if digest is None:
+        digest = fingerprint(directory)
+    sections = read_sections(os.path.join(directory, SNAPSHOT_NAME), MAGIC,
+                             digest)
+    if sections is None or any(
+        name not in sections for name in GRAPH_SECTIONS + TEXT_SECTIONS
+    ):
+        return None
+    graph = Graph(sections["person_ids"], sections["movie_ids"],
+                  *(sections[name] for name in GRAPH_SECTIONS))
+    people = zip(sections["person_ids"], sections["person_names"],
+                 sections["person_births"])
+    movies = zip(sections["movie_ids"], sections["movie_titles"],
+                 sections["movie_years"])
+    return graph, list(people), list(movies)
@@ -0,0 +1,197 @@
+import random
+import sys
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import degrees
+from degrees_batch import init_worker
+
+
+def main():
+    if len(sys.argv) not in (2, 3, 4):
+        sys.exit("Usage: python degrees_stats.py directory "
+                 "[samples] [workers]")
+    directory = sys.argv[1]
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+    with timed("Loading data"):
+        degrees.load_data(directory, snapshot=True)
+    graph = degrees.graph
+    print(f"{graph.num_people()} people, {graph.num_movies()} movies, "
+          f"{len(graph.person_movies)} stars, "
+          f"{len(graph.costar_people) // 2} co-star pairs")
+
+    with timed("Connected components"):
+        labels, sizes = components(graph)
+    print(f"{len(sizes)} components, largest has {sizes[0][1]} people, "
+          f"{sum(1 for _, size in sizes if size == 1)} people are isolated")
+
+    with timed("Degree distribution"):
+        distribution = degree_distribution(graph)
+    print("Co-stars  People")
+    for degree, count in sorted(distribution.items())[:10]:
+        print(f"{degree:8}  {count}")
+    print(f"Maximum degree: {max(distribution)}")
+
+    # Sample sources from the largest component so every search is long
+    largest = sizes[0][0]
+    people = [p for p in range(graph.num_people()) if labels[p] == largest]
+    sources = random.sample(people, min(samples, len(people)))
+    with timed(f"Sampled searches from {len(sources)} people"):
+        eccentricities, betweenness = sample_searches(
+            sources, directory, workers
+        )
+    print(f"Diameter of largest component is between "
+          f"{max(eccentricities.values())} and "
+          f"{2 * min(eccentricities.values())}")
+
+    # Scale sampled dependencies up to an estimate over all sources,
+    # halved since searches from both ends count each pair of people
+    scale = len(people) / len(sources) / 2
+    print("Most central people:")
+    central = sorted(range(len(betweenness)), key=betweenness.__getitem__,
+                     reverse=True)
+    for person in central[:10]:
+        person_id = graph.person_ids[person]
+        name = degrees.people[person_id]["name"]
+        print(f"  {name} ({person_id}): {betweenness[person] * scale:.0f}")
+
+
+@contextmanager
+def timed(label):
+    """
+    Prints how long the block it wraps took.
+    """
+    start = time.perf_counter()
+    yield
+    print(f"{label}: {time.perf_counter() - start:.2f}s")
+
+
+def components(graph):
+    """
+    Finds the connected components of `graph` with union-find over the
+    stars of each movie. Returns a list labelling each person index with
+    its component's root, and (root, size) pairs from largest to smallest.
+    """
+    parent = array("i", range(graph.num_people()))
+
+    def find(person):
+        root = person
+        while parent[root] != root:
+            root = parent[root]
+
+        # Compress the path so later finds are shorter
+        while parent[person] != root:
+            parent[person], person = root, parent[person]
+        return root
+
+    for movie in range(graph.num_movies()):
+        stars = graph.stars_of(movie)
+        if len(stars) < 2:
+            continue
+        root = find(stars[0])
+        for star in stars[1:]:
+            other = find(star)
+            if other != root:
+                parent[other] = root
+
+    labels = array("i", (find(person) for person in range(len(parent))))
+    sizes = Counter(labels)
+    return labels, sorted(sizes.items(), key=lambda item: item[1],
+                          reverse=True)
+
+
+def degree_distribution(graph):
+    """
+    Returns a dictionary mapping each number of co-stars
+    to the number of people with that many.
+    """
+    offsets = graph.costar_offsets
+    return Counter(
+        offsets[person + 1] - offsets[person]
+        for person in range(graph.num_people())
+    )
+
+
+def sample_searches(sources, directory, workers=1):
+    """
+    Runs a breadth-first search from each person index in `sources`,
+    spreading them over a process pool that loads `directory` if there is
+    more than one worker.
+
+    Returns a dictionary mapping each source to its eccentricity, and
+    the betweenness dependencies of every person summed over all sources.
+    """
+    if workers > 1:
+        chunks = [sources[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=init_worker,
+                                 initargs=(directory,)) as executor:
+            results = list(executor.map(search_statistics, chunks))
+    else:
+        results = [search_statistics(sources)]
+
+    eccentricities = {}
+    betweenness = array("d", [0]) * degrees.graph.num_people()
+    for chunk_eccentricities, chunk_betweenness in results:
+        eccentricities.update(chunk_eccentricities)
+        for person, dependency in enumerate(chunk_betweenness):
+            betweenness[person] += dependency
+    return eccentricities, betweenness
+
+
+def search_statistics(sources):
+    """
+    Runs Brandes' algorithm from each person index in `sources` over the
+    co-star graph. Returns a dictionary of each source's eccentricity and
+    an array of each person's dependency summed over the sources.
+    """
+    graph = degrees.graph
+    costar_offsets = graph.costar_offsets
+    costar_people = graph.costar_people
+    num_people = graph.num_people()
+
+    eccentricities = {}
+    betweenness = array("d", [0]) * num_people
+    for source in sources:
+        dist = array("i", [-1]) * num_people
+        paths = array("d", [0]) * num_people
+        dist[source] = 0
+        paths[source] = 1
+        order = [source]
+        i = 0
+
+        # Count shortest paths to each person in breadth-first order
+        while i < len(order):
+            person = order[i]
+            i += 1
+            depth = dist[person] + 1
+            for j in range(costar_offsets[person], costar_offsets[person + 1]):
+                star = costar_people[j]
+                if dist[star] == -1:
+                    dist[star] = depth
+                    order.append(star)
+                if dist[star] == depth:
+                    paths[star] += paths[person]
+        eccentricities[source] = dist[order[-1]]
+
+        # Accumulate dependencies from the farthest people back
+        dependency = array("d", [0]) * num_people
+        for person in reversed(order):
+            depth = dist[person] - 1
+            share = (1 + dependency[person]) / paths[person]
+            for j in range(costar_offsets[person], costar_offsets[person + 1]):
+                star = costar_people[j]
+                if dist[star] == depth:
+                    dependency[star] += paths[star] * share
+            if person != source:
+                betweenness[person] += dependency[person]
+    return eccentricities, betweenness
+
+
+if __name__ == "__main__":
+    main()
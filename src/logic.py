@@ -1,19 +1,194 @@
+import heapq
+import inspect
 import itertools
-
-
-class Sentence():
+import multiprocessing
+import os
+import weakref
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Sentences and symbols each pool worker checks, set by init_checker
+checker = None
+
+
+class Interned(type):
+    """
+    Metaclass returning the existing instance when a sentence is built
+    from the same parts as a live one, as long as nothing in it can
+    change, so equal sentences share one node and its cached values.
+    Classes opt in by returning a key from `intern_key`.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls.instances = weakref.WeakValueDictionary()
+
+    def __call__(cls, *arguments, **keywords):
+
+        # Keyword arguments are put in order so they intern the same way
+        if keywords:
+            bound = inspect.signature(cls.__init__).bind(
+                None, *arguments, **keywords
+            )
+            arguments = bound.args[1:]
+        key = cls.intern_key(arguments)
+        if key is None:
+            return super().__call__(*arguments)
+        sentence = cls.instances.get(key)
+        if sentence is None:
+            sentence = super().__call__(*arguments)
+            cls.instances[key] = sentence
+        return sentence
+
+
+class Sentence(metaclass=Interned):
+
+    # Whether the sentence can never change, which holds unless it
+    # contains an And
+    stable = True
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def arguments(self):
+        """Returns the arguments the logical sentence was built from."""
+        return ()
+
+    def __reduce_ex__(self, protocol):
+
+        # Sentences that give their arguments are rebuilt through the
+        # constructor, so unpickled ones are interned too, leaving cached
+        # values behind
+        if type(self).arguments is Sentence.arguments:
+            return super().__reduce_ex__(protocol)
+        return (type(self), self.arguments())
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.frozen_symbols())
+
+    def frozen_symbols(self):
+        """Returns the cached frozenset of symbols in the logical sentence."""
+        return frozenset()
+
+    def cached(self, name, compute):
+        """
+        Returns the value cached under `name`, calling `compute` to work
+        it out the first time. Sentences that are not stable can change
+        without notice, through their conjuncts lists, so `compute` is
+        called every time for them.
+        """
+        if not self.stable:
+            return compute()
+        values = self.__dict__.get("_cache")
+        if values is None:
+            values = self._cache = {}
+        if name not in values:
+            values[name] = compute()
+        return values[name]
+
+    def snapshot(self):
+        """
+        Returns a value equal to a later snapshot of the logical sentence
+        only if the sentence has not changed in between. Stable sentences
+        can't change, so they are their own snapshot.
+        """
+        if self.stable:
+            return self
+        return (type(self),) + tuple(
+            argument.snapshot() for argument in self.arguments()
+        )
+
+    @classmethod
+    def intern_key(cls, arguments):
+        """
+        Returns the key a sentence built from `arguments` is interned
+        under, or None if it should not be interned. Only the sentence
+        classes that override this are interned.
+        """
+        return None
+
+    @staticmethod
+    def operands_key(operands):
+        """
+        Returns the intern key of a sentence built from the sentences
+        `operands`, or None if any of them can change.
+        """
+        for operand in operands:
+            Sentence.validate(operand)
+        if all(operand.stable for operand in operands):
+
+            # Stable operands are interned, so identity is equality
+            return tuple(id(operand) for operand in operands)
+        return None
+
+    def cnf(self):
+        """
+        Returns a CNF clause database requiring the logical sentence to be
+        true. It is compiled once and cached until the sentence changes.
+        """
+        key = self.snapshot()
+        cached = self.__dict__.get("_cnf")
+        if cached is None or cached[0] != key:
+            cnf = CNF()
+            cnf.add(self)
+            self._cnf = (key, cnf)
+        return self._cnf[1]
+
+    def expression(self, positions):
+        """
+        Returns Python source for an expression evaluating the logical
+        sentence in `model`, a sequence of truth values where the value
+        of each symbol is at the index `positions` maps its name to.
+        """
+        raise Exception("nothing to evaluate")
+
+    def partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave symbols
+        out. Returns True or False if every way of assigning them gives
+        that value as far as the connectives show, otherwise None.
+        """
+        raise Exception("nothing to evaluate")
+
+    def truth_table(self, columns, mask):
+        """
+        Evaluates the logical sentence in many models at once. `columns`
+        maps each symbol name to an integer whose bits are its value in
+        each model and `mask` has a bit set for every model. Returns the
+        bits of the models where the sentence is true.
+        """
+        raise Exception("nothing to evaluate")
+
+    def compile(self, symbols):
+        """
+        Returns a function evaluating the logical sentence in a model given
+        as a sequence of truth values, one for each name in `symbols`. It
+        is compiled once and cached until the sentence or symbols change.
+        """
+        key = self.snapshot()
+        cached = self.__dict__.get("_compiled")
+        if cached is None or cached[0] != key:
+            cached = self._compiled = (key, {})
+        symbols = tuple(symbols)
+        if symbols in cached[1]:
+            return cached[1][symbols]
+        positions = {name: i for i, name in enumerate(symbols)}
+        source = self.expression(positions)
+        try:
+            function = eval(f"lambda model: {source}")
+
+        # Sentences nested too deeply for the parser use the tree instead
+        except (SyntaxError, RecursionError, MemoryError):
+            def function(model):
+                return self.evaluate(dict(zip(symbols, model)))
+        cached[1][symbols] = function
+        return function
 
     @classmethod
     def validate(cls, sentence):
@@ -47,11 +222,20 @@ class Symbol(Sentence):
     def __init__(self, name):
         self.name = name
 
+    @classmethod
+    def intern_key(cls, arguments):
+        return arguments
+
+    def arguments(self):
+        return (self.name,)
+
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or (
+            isinstance(other, Symbol) and self.name == other.name
+        )
 
     def __hash__(self):
-        return hash(("symbol", self.name))
+        return self.cached("hash", lambda: hash(("symbol", self.name)))
 
     def __repr__(self):
         return self.name
@@ -62,23 +246,49 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
+    def truth_table(self, columns, mask):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def expression(self, positions):
+        try:
+            return f"model[{positions[self.name]}]"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def frozen_symbols(self):
+        return self.cached("symbols", lambda: frozenset([self.name]))
 
 
 class Not(Sentence):
     def __init__(self, operand):
         Sentence.validate(operand)
         self.operand = operand
+        self.stable = operand.stable
+
+    @classmethod
+    def intern_key(cls, arguments):
+        return Sentence.operands_key(arguments)
+
+    def arguments(self):
+        return (self.operand,)
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (
+            isinstance(other, Not) and self.operand == other.operand
+        )
 
     def __hash__(self):
-        return hash(("not", hash(self.operand)))
+        return self.cached("hash", lambda: hash(("not", hash(self.operand))))
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +296,45 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def partial(self, model):
+        value = self.operand.partial(model)
+        return None if value is None else not value
+
+    def truth_table(self, columns, mask):
+        return mask ^ self.operand.truth_table(columns, mask)
+
+    def expression(self, positions):
+        return f"(not {self.operand.expression(positions)})"
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def frozen_symbols(self):
+        return self.operand.frozen_symbols()
 
 
 class And(Sentence):
+
+    # Conjuncts can be added, so conjunctions are never shared
+    stable = False
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
 
+    def arguments(self):
+        return tuple(self.conjuncts)
+
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (
+            isinstance(other, And) and self.conjuncts == other.conjuncts
+        )
 
     def __hash__(self):
-        return hash(
+        return self.cached("hash", lambda: hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        ))
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -120,29 +349,66 @@ class And(Sentence):
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
+    def truth_table(self, columns, mask):
+        result = mask
+        for conjunct in self.conjuncts:
+            result &= conjunct.truth_table(columns, mask)
+            if not result:
+                break
+        return result
+
+    def expression(self, positions):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            conjunct.expression(positions) for conjunct in self.conjuncts
+        ) + ")"
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def frozen_symbols(self):
+        return self.cached("symbols", lambda: frozenset().union(
+            *[conjunct.frozen_symbols() for conjunct in self.conjuncts]
+        ))
 
 
 class Or(Sentence):
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        self.disjuncts = tuple(disjuncts)
+        self.stable = all(disjunct.stable for disjunct in disjuncts)
+
+    @classmethod
+    def intern_key(cls, arguments):
+        return Sentence.operands_key(arguments)
+
+    def arguments(self):
+        return self.disjuncts
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (
+            isinstance(other, Or) and self.disjuncts == other.disjuncts
+        )
 
     def __hash__(self):
-        return hash(
+        return self.cached("hash", lambda: hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        ))
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,14 +417,41 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
+    def truth_table(self, columns, mask):
+        result = 0
+        for disjunct in self.disjuncts:
+            result |= disjunct.truth_table(columns, mask)
+            if result == mask:
+                break
+        return result
+
+    def expression(self, positions):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            disjunct.expression(positions) for disjunct in self.disjuncts
+        ) + ")"
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def frozen_symbols(self):
+        return self.cached("symbols", lambda: frozenset().union(
+            *[disjunct.frozen_symbols() for disjunct in self.disjuncts]
+        ))
 
 
 class Implication(Sentence):
@@ -167,14 +460,24 @@ class Implication(Sentence):
         Sentence.validate(consequent)
         self.antecedent = antecedent
         self.consequent = consequent
+        self.stable = antecedent.stable and consequent.stable
+
+    @classmethod
+    def intern_key(cls, arguments):
+        return Sentence.operands_key(arguments)
+
+    def arguments(self):
+        return (self.antecedent, self.consequent)
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (isinstance(other, Implication)
+                                 and self.antecedent == other.antecedent
+                                 and self.consequent == other.consequent)
 
     def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        return self.cached("hash", lambda: hash(
+            ("implies", hash(self.antecedent), hash(self.consequent))
+        ))
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,13 +486,36 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def partial(self, model):
+        antecedent = self.antecedent.partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.partial(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
+
+    def truth_table(self, columns, mask):
+        antecedent = self.antecedent.truth_table(columns, mask)
+        return (mask ^ antecedent) | self.consequent.truth_table(columns, mask)
+
+    def expression(self, positions):
+        antecedent = self.antecedent.expression(positions)
+        consequent = self.consequent.expression(positions)
+        return f"(not {antecedent} or {consequent})"
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def frozen_symbols(self):
+        return self.cached("symbols", lambda: (
+            self.antecedent.frozen_symbols()
+            | self.consequent.frozen_symbols()
+        ))
 
 
 class Biconditional(Sentence):
@@ -198,14 +524,24 @@ class Biconditional(Sentence):
         Sentence.validate(right)
         self.left = left
         self.right = right
+        self.stable = left.stable and right.stable
+
+    @classmethod
+    def intern_key(cls, arguments):
+        return Sentence.operands_key(arguments)
+
+    def arguments(self):
+        return (self.left, self.right)
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (isinstance(other, Biconditional)
+                                 and self.left == other.left
+                                 and self.right == other.right)
 
     def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        return self.cached("hash", lambda: hash(
+            ("biconditional", hash(self.left), hash(self.right))
+        ))
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,20 +552,851 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def partial(self, model):
+        left = self.left.partial(model)
+        if left is None:
+            return None
+        right = self.right.partial(model)
+        if right is None:
+            return None
+        return left == right
+
+    def truth_table(self, columns, mask):
+        left = self.left.truth_table(columns, mask)
+        return mask ^ left ^ self.right.truth_table(columns, mask)
+
+    def expression(self, positions):
+        left = self.left.expression(positions)
+        right = self.right.expression(positions)
+        return f"(bool({left}) == bool({right}))"
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def frozen_symbols(self):
+        return self.cached("symbols", lambda: (
+            self.left.frozen_symbols() | self.right.frozen_symbols()
+        ))
+
+
+class Solver():
+    """
+    CDCL SAT solver over clauses of integer literals, where variable `v`
+    is the literal `v` and its negation is `-v`.
+
+    Each clause watches two of its literals, so unit propagation only
+    visits clauses whose watched literal just became false. Conflicts are
+    analysed to their first unique implication point, the learned clause
+    is kept, and the search backjumps non-chronologically. Branching
+    picks the most active variable and solving can be done under
+    assumptions, keeping everything learned between calls.
+    """
+
+    def __init__(self):
+        self.num_vars = 0
+        self.clauses = []
+        self.watches = [[], []]
+        self.values = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.phases = [False]
+        self.activity = [0.0]
+        self.increment = 1.0
+        self.order = []
+        self.trail = []
+        self.trail_limits = []
+        self.head = 0
+        self.ok = True
+        self.model = None
+
+    def new_var(self):
+        """Adds a variable and returns it."""
+        self.num_vars += 1
+        self.watches.extend(([], []))
+        self.values.append(None)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.phases.append(False)
+        self.activity.append(0.0)
+        heapq.heappush(self.order, (0.0, self.num_vars))
+        return self.num_vars
+
+    @staticmethod
+    def index(literal):
+        """Returns the position of `literal`'s watch list."""
+        return 2 * literal if literal > 0 else -2 * literal + 1
+
+    def value(self, literal):
+        """Returns True, False or None if `literal` is unassigned."""
+        value = self.values[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def add_clause(self, literals):
+        """
+        Adds a clause, a list of literals at least one of which must hold.
+        Returns False if the clauses became unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+        clause = []
+        for literal in literals:
+            while abs(literal) > self.num_vars:
+                self.new_var()
+            if -literal in clause or self.value(literal) is True:
+                return True
+            if literal not in clause and self.value(literal) is None:
+                clause.append(literal)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause)
+        return self.ok
+
+    def attach(self, clause):
+        """Stores `clause`, watching its first two literals."""
+        self.clauses.append(clause)
+        self.watches[self.index(clause[0])].append(len(self.clauses) - 1)
+        self.watches[self.index(clause[1])].append(len(self.clauses) - 1)
+        return len(self.clauses) - 1
+
+    def assign(self, literal, reason):
+        """Makes `literal` true, implied by clause index `reason`."""
+        variable = abs(literal)
+        self.values[variable] = literal > 0
+        self.levels[variable] = len(self.trail_limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by a unit clause.
+        Returns the index of a clause that became false, otherwise None.
+        """
+        while self.head < len(self.trail):
+            false_literal = -self.trail[self.head]
+            self.head += 1
+            watchers = self.watches[self.index(false_literal)]
+            kept = 0
+            i = 0
+            while i < len(watchers):
+                number = watchers[i]
+                i += 1
+                clause = self.clauses[number]
+
+                # Keep the false watched literal in the second position
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], false_literal
+                first = self.value(clause[0])
+                if first is True:
+                    watchers[kept] = number
+                    kept += 1
+                    continue
+
+                # Look for another literal that is not false to watch
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], false_literal
+                        self.watches[self.index(clause[1])].append(number)
+                        break
+                else:
+                    watchers[kept] = number
+                    kept += 1
+                    if first is False:
+                        watchers[kept:] = watchers[i:]
+                        self.head = len(self.trail)
+                        return number
+                    self.assign(clause[0], number)
+            del watchers[kept:]
+        return None
+
+    def analyze(self, conflict):
+        """
+        Derives a learned clause from the clause index `conflict` by
+        resolving away literals of the current decision level until only
+        one is left. Returns the clause, with that literal first, and the
+        level to backjump to.
+        """
+        level = len(self.trail_limits)
+        learned = [None]
+        seen = set()
+        pending = 0
+        literal = None
+        position = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for other in (clause if literal is None else clause[1:]):
+                variable = abs(other)
+                if variable in seen or self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if self.levels[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+
+            # Resolve on the most recently assigned literal involved
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+        learned[0] = -literal
+
+        backjump = 0
+        if len(learned) > 1:
+            deepest = max(range(1, len(learned)),
+                          key=lambda i: self.levels[abs(learned[i])])
+            learned[1], learned[deepest] = learned[deepest], learned[1]
+            backjump = self.levels[abs(learned[1])]
+        return learned, backjump
+
+    def bump(self, variable):
+        """Raises the activity of a variable involved in a conflict."""
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.order = [(-self.activity[v], v)
+                          for v in range(1, self.num_vars + 1)
+                          if self.values[v] is None]
+            heapq.heapify(self.order)
+        elif self.values[variable] is None:
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+
+    def cancel_until(self, level):
+        """Undoes every assignment made above decision level `level`."""
+        if len(self.trail_limits) <= level:
+            return
+        start = self.trail_limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.values[variable] = None
+            self.reasons[variable] = None
+            self.phases[variable] = literal > 0
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.trail_limits[level:]
+        self.head = len(self.trail)
+
+    def pick_branch(self):
+        """Returns the most active unassigned variable, or None."""
+        while self.order:
+            activity, variable = heapq.heappop(self.order)
+            if (self.values[variable] is None
+                    and -activity == self.activity[variable]):
+                return variable
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses and the `assumptions`, a sequence of
+        literals, can all hold together, storing a satisfying assignment
+        in `model` as a list of booleans indexed by variable.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        for literal in assumptions:
+            while abs(literal) > self.num_vars:
+                self.new_var()
+        self.cancel_until(0)
+        conflicts = 0
+        restart = 100
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.trail_limits:
+                    self.ok = False
+                    return False
+                conflicts += 1
+                learned, backjump = self.analyze(conflict)
+                self.cancel_until(backjump)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.assign(learned[0], self.attach(learned))
+                self.increment /= 0.95
+                continue
+
+            if conflicts >= restart:
+                conflicts = 0
+                restart = int(restart * 1.5)
+                self.cancel_until(0)
+                continue
+
+            # Decide the assumptions first, each on its own level
+            level = len(self.trail_limits)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self.value(literal)
+                if value is False:
+                    self.cancel_until(0)
+                    return False
+                self.trail_limits.append(len(self.trail))
+                if value is None:
+                    self.assign(literal, None)
+                continue
+
+            variable = self.pick_branch()
+            if variable is None:
+                self.model = list(self.values)
+                self.cancel_until(0)
+                return True
+            self.trail_limits.append(len(self.trail))
+            self.assign(variable if self.phases[variable] else -variable,
+                        None)
+
+
+class CNF():
+    """
+    Clause database holding sentences in conjunctive normal form.
+
+    Symbols are numbered from 1 and each connective gets a new Tseitin
+    variable defined by clauses equivalent to it, so the clauses grow
+    linearly with the sentence. Clause `i` is the slice
+    `literals[offsets[i]:offsets[i + 1]]` of a flat array of integer
+    literals, where `-v` is the negation of variable `v`.
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.names = [None]
+        self.literals = array("i")
+        self.offsets = array("i", [0])
+        self.encoded = {}
+
+    def copy(self):
+        """Returns an independent copy that more sentences can be added to."""
+        other = CNF()
+        other.variables = dict(self.variables)
+        other.names = list(self.names)
+        other.literals = array("i", self.literals)
+        other.offsets = array("i", self.offsets)
+        other.encoded = dict(self.encoded)
+        return other
+
+    def num_vars(self):
+        return len(self.names) - 1
+
+    def num_clauses(self):
+        return len(self.offsets) - 1
+
+    def clause(self, i):
+        """Returns the literals of clause `i`."""
+        return self.literals[self.offsets[i]:self.offsets[i + 1]]
+
+    def clauses(self):
+        """Yields every clause as a list of literals."""
+        for i in range(self.num_clauses()):
+            yield list(self.clause(i))
+
+    def variable(self, name):
+        """Returns the variable of symbol `name`, adding it if needed."""
+        if name not in self.variables:
+            self.names.append(name)
+            self.variables[name] = len(self.names) - 1
+        return self.variables[name]
+
+    def symbol(self, variable):
+        """Returns the symbol name of `variable`, or None for Tseitin ones."""
+        return self.names[variable]
+
+    def new_var(self):
+        self.names.append(None)
+        return len(self.names) - 1
+
+    def append(self, clause):
+        """Adds a clause, a list of literals."""
+        self.literals.extend(clause)
+        self.offsets.append(len(self.literals))
+
+    def add(self, sentence):
+        """
+        Adds clauses requiring `sentence` to be true. Conjunctions
+        at the top are split into separate sentences.
+        """
+        pending = [sentence]
+        while pending:
+            sentence = pending.pop()
+            if isinstance(sentence, And):
+                pending.extend(reversed(sentence.conjuncts))
+            else:
+                self.append([self.encode(sentence)])
+
+    def encode(self, sentence):
+        """
+        Returns a literal equivalent to `sentence`, adding the definitions
+        of any new Tseitin variables it needs. Stable sentences already
+        encoded are reused, while those containing an And are encoded
+        again each time, since they may have changed.
+        """
+        key = id(sentence)
+        if key in self.encoded:
+            return self.encoded[key][1]
+
+        if isinstance(sentence, Symbol):
+            literal = self.variable(sentence.name)
+        elif isinstance(sentence, Not):
+            literal = -self.encode(sentence.operand)
+        elif isinstance(sentence, (And, Or)):
+            if isinstance(sentence, And):
+                operands, sign = sentence.conjuncts, 1
+            else:
+                operands, sign = sentence.disjuncts, -1
+            literals = [self.encode(operand) for operand in operands]
+
+            # x <=> (a or b ...) is x <=> not (not a and not b ...)
+            literal = self.new_var()
+            for operand in literals:
+                self.append([-sign * literal, sign * operand])
+            self.append([sign * literal]
+                        + [-sign * operand for operand in literals])
+        elif isinstance(sentence, Implication):
+            antecedent = self.encode(sentence.antecedent)
+            consequent = self.encode(sentence.consequent)
+            literal = self.new_var()
+            self.append([-literal, -antecedent, consequent])
+            self.append([literal, antecedent])
+            self.append([literal, -consequent])
+        elif isinstance(sentence, Biconditional):
+            left = self.encode(sentence.left)
+            right = self.encode(sentence.right)
+            literal = self.new_var()
+            self.append([-literal, -left, right])
+            self.append([-literal, left, -right])
+            self.append([literal, left, right])
+            self.append([literal, -left, -right])
+        else:
+            raise TypeError("must be a logical sentence")
 
+        # Keep the sentence alive so that its id is not reused
+        if sentence.stable:
+            self.encoded[key] = (sentence, literal)
+        return literal
+
+    def dimacs(self):
+        """Returns the clauses in the DIMACS CNF text format."""
+        lines = [f"p cnf {self.num_vars()} {self.num_clauses()}"]
+        for clause in self.clauses():
+            lines.append(" ".join(str(literal) for literal in clause + [0]))
+        return "\n".join(lines) + "\n"
+
+
+class IncrementalKB():
+    """
+    Knowledge base that grows one sentence at a time, wrapping an And.
+
+    Its clauses are fed to one SAT solver as sentences are added, so
+    whatever the solver learned stays useful for later queries, which
+    are answered by assuming the query false. Models found along the
+    way are cached and refute later queries without solving, for as
+    long as the sentences added since still hold in them. If a conjunct
+    already encoded is changed, replaced or removed, everything is
+    encoded again from scratch.
+    """
+
+    # Most models of the knowledge base kept to check queries against
+    MODEL_CACHE = 16
+
+    def __init__(self, knowledge=None):
+        if knowledge is None:
+            knowledge = And()
+        elif not isinstance(knowledge, And):
+            knowledge = And(knowledge)
+        self.knowledge = knowledge
+        self.reset()
+
+    def reset(self):
+        """Forgets every clause, learned clause and model."""
+        self.cnf = CNF()
+        self.solver = Solver()
+        self.models = []
+        self.encoded = []
+        self.fed = 0
+
+    def add(self, sentence):
+        """Adds `sentence` to the knowledge base."""
+        self.knowledge.add(sentence)
+        self.update()
+
+    def update(self):
+        """
+        Encodes conjuncts added to the wrapped And since the last update,
+        including any added to it directly, and drops cached models they
+        rule out.
+        """
+        if self.changed():
+            self.reset()
+        for conjunct in self.knowledge.conjuncts[len(self.encoded):]:
+            self.cnf.add(conjunct)
+            self.models = [
+                model for model in self.models
+                if conjunct.partial(model) is True
+            ]
+
+            # Conjuncts containing an And are checked for changes by
+            # comparing snapshots
+            key = None if conjunct.stable else conjunct.snapshot()
+            self.encoded.append((conjunct, key))
+        self.feed()
+
+    def changed(self):
+        """
+        Checks if any conjunct already encoded has since been changed,
+        replaced or removed from the wrapped And.
+        """
+        conjuncts = self.knowledge.conjuncts
+        if len(conjuncts) < len(self.encoded):
+            return True
+        return any(
+            conjuncts[i] is not conjunct
+            or (key is not None and conjunct.snapshot() != key)
+            for i, (conjunct, key) in enumerate(self.encoded)
+        )
+
+    def feed(self):
+        """Adds the clauses the solver has not seen yet."""
+        for i in range(self.fed, self.cnf.num_clauses()):
+            self.solver.add_clause(list(self.cnf.clause(i)))
+        self.fed = self.cnf.num_clauses()
+
+    def entails(self, query):
+        """Checks if the knowledge base entails `query`."""
+        self.update()
+        for model in self.models:
+            if query.partial(model) is False:
+                return False
+        literal = self.cnf.encode(query)
+        self.feed()
+        if not self.solver.solve([-literal]):
+            return True
+
+        # Remember the model by symbol, since it refutes the query
+        model = {
+            name: self.solver.model[variable]
+            for name, variable in self.cnf.variables.items()
+            if variable <= self.solver.num_vars
+        }
+        self.models.insert(0, model)
+        del self.models[self.MODEL_CACHE:]
+        return False
+
+    def check(self, query):
+        """
+        Returns "entailed" if the knowledge base entails `query`,
+        "contradicted" if it entails its negation, otherwise "unknown".
+        """
+        if self.entails(query):
+            return "entailed"
+        if self.entails(Not(query)):
+            return "contradicted"
+        return "unknown"
+
+
+def sat_entails(knowledge, query):
+    """
+    Checks if knowledge base entails query by asking a SAT solver
+    whether knowledge base and not query can both be true.
+    """
+    cnf = knowledge.cnf().copy()
+    cnf.add(Not(query))
+    solver = Solver()
+    for clause in cnf.clauses():
+        if not solver.add_clause(clause):
+            return True
+    return not solver.solve()
+
+
+def compiled_entails(knowledge, query):
+    """
+    Checks if knowledge base entails query by evaluating compiled versions
+    of both in every model of their symbols.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    knowledge_holds = knowledge.compile(symbols)
+    query_holds = query.compile(symbols)
+    return all(
+        query_holds(model)
+        for model in itertools.product((True, False), repeat=len(symbols))
+        if knowledge_holds(model)
+    )
+
+
+def bitwise_entails(knowledge, query, block=16):
+    """
+    Checks if knowledge base entails query by evaluating both in blocks
+    of 2 ** `block` models at once, one bit per model. Within a block
+    the first symbols take every combination of values and the rest are
+    fixed, so each block costs one pass over the sentences.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    for columns, mask in truth_table_blocks(symbols, block):
+        knowledge_true = knowledge.truth_table(columns, mask)
+        if knowledge_true & ~query.truth_table(columns, mask):
+            return False
+    return True
+
+
+def truth_table_blocks(symbols, block=16):
+    """
+    Yields (columns, mask) pairs covering every model of `symbols` in
+    blocks of 2 ** `block` models, for Sentence.truth_table. Within a
+    block the first symbols take every combination of values and the
+    rest are fixed.
+    """
+    varying = symbols[:block]
+    width = 1 << len(varying)
+    mask = (1 << width) - 1
+
+    # Bit j of symbol i's column is bit i of j
+    patterns = []
+    for i in range(len(varying)):
+        period = 1 << (i + 1)
+        pattern = ((1 << (1 << i)) - 1) << (1 << i)
+        while period < width:
+            pattern |= pattern << period
+            period <<= 1
+        patterns.append(pattern)
+    columns = dict(zip(varying, patterns))
+
+    fixed = symbols[block:]
+    for values in itertools.product((mask, 0), repeat=len(fixed)):
+        columns.update(zip(fixed, values))
+        yield columns, mask
+
+
+def check_queries(knowledge, queries, method="enumerate"):
+    """
+    Checks many queries against one knowledge base. Returns a list with,
+    for each query, "entailed" if it is true in every model of knowledge,
+    "contradicted" if it is false in every one, and "unknown" otherwise.
+
+    With `method` "enumerate", the models of knowledge are found once per
+    block of the truth table and every query is checked against them.
+    With "sat", one solver answers every query under assumptions, and
+    each model it finds settles what it shows for all of the queries.
+    """
+    if method == "sat":
+        can_be_true, can_be_false = sat_outcomes(knowledge, queries)
+    elif method == "enumerate":
+        can_be_true, can_be_false = enumerated_outcomes(knowledge, queries)
+    else:
+        raise ValueError(f"unknown query checking method {method!r}")
+
+    # Everything is entailed by a knowledge base with no models
+    return [
+        "entailed" if not false
+        else "contradicted" if not true
+        else "unknown"
+        for true, false in zip(can_be_true, can_be_false)
+    ]
+
+
+def enumerated_outcomes(knowledge, queries):
+    """
+    Returns lists of whether each of `queries` is true in some model of
+    `knowledge`, and whether it is false in some model, by evaluating
+    blocks of the truth table as bits.
+    """
+    symbols = sorted(knowledge.symbols().union(
+        *[query.symbols() for query in queries]
+    ))
+    can_be_true = [False] * len(queries)
+    can_be_false = [False] * len(queries)
+    undecided = set(range(len(queries)))
+    for columns, mask in truth_table_blocks(symbols):
+        knowledge_true = knowledge.truth_table(columns, mask)
+        if not knowledge_true:
+            continue
+        for i in list(undecided):
+            query_true = queries[i].truth_table(columns, mask)
+            if knowledge_true & query_true:
+                can_be_true[i] = True
+            if knowledge_true & ~query_true:
+                can_be_false[i] = True
+            if can_be_true[i] and can_be_false[i]:
+                undecided.discard(i)
+        if not undecided:
+            break
+    return can_be_true, can_be_false
+
+
+def sat_outcomes(knowledge, queries):
+    """
+    Returns lists of whether each of `queries` is true in some model of
+    `knowledge`, and whether it is false in some model, by solving under
+    the assumption of each outcome not yet seen in an earlier model.
+    """
+    cnf = knowledge.cnf().copy()
+    literals = [cnf.encode(query) for query in queries]
+    can_be_true = [False] * len(queries)
+    can_be_false = [False] * len(queries)
+    solver = Solver()
+    for clause in cnf.clauses():
+        if not solver.add_clause(clause):
+            return can_be_true, can_be_false
+
+    # Symbols only in queries still need a value in every model
+    while solver.num_vars < cnf.num_vars():
+        solver.new_var()
+    for i, literal in enumerate(literals):
+        for outcome, assumption in ((can_be_true, literal),
+                                    (can_be_false, -literal)):
+            if outcome[i] or not solver.solve([assumption]):
+                continue
+
+            # The model shows an outcome of every query, not just this one
+            for j, other in enumerate(literals):
+                if solver.model[abs(other)] == (other > 0):
+                    can_be_true[j] = True
+                else:
+                    can_be_false[j] = True
+    return can_be_true, can_be_false
+
+
+def parallel_entails(knowledge, query, workers=None, split=None):
+    """
+    Checks if knowledge base entails query by enumerating models in a
+    pool of `workers` processes, by default one per CPU. The models are
+    split into cubes by fixing the first `split` symbols, by default
+    enough for a few cubes per worker, and every worker stops as soon as
+    one finds a model where knowledge is true and query is false.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    workers = workers or os.cpu_count() or 1
+    if split is None:
+        split = (4 * workers - 1).bit_length()
+    split = min(split, len(symbols))
+
+    stop = multiprocessing.Event()
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=init_checker,
+                             initargs=(knowledge, query, symbols,
+                                       stop)) as executor:
+        futures = [
+            executor.submit(check_cube, values)
+            for values in itertools.product((True, False), repeat=split)
+        ]
+        for future in as_completed(futures):
+            if future.result() is False:
+                stop.set()
+                for other in futures:
+                    other.cancel()
+                return False
+    return True
+
+
+def init_checker(knowledge, query, symbols, stop):
+    """
+    Sets up a pool worker to check models of `symbols`, stopping early
+    once the event `stop` is set.
+    """
+    global checker
+    checker = (knowledge.compile(symbols), query.compile(symbols),
+               len(symbols), stop)
+
+
+def check_cube(values):
+    """
+    Checks every model whose first symbols take `values`. Returns False
+    if knowledge is true and query false in one of them, None if another
+    worker found one first, and True otherwise.
+    """
+    knowledge_holds, query_holds, num_symbols, stop = checker
+    rest = itertools.product((True, False), repeat=num_symbols - len(values))
+    for count, suffix in enumerate(rest):
+        if count % 4096 == 0 and stop.is_set():
+            return None
+        model = values + suffix
+        if knowledge_holds(model) and not query_holds(model):
+            stop.set()
+            return False
+    return True
+
+
+def pruned_entails(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query by assigning symbols one at a
+    time, evaluating both sentences in each partial model to skip every
+    completion of it once the answer there is known. If `stats` is a
+    dictionary, the number of partial models visited is stored in it
+    under "nodes".
+    """
+    counts = stats if stats is not None else {}
+    counts["nodes"] = 0
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    model = {}
+
+    def check_from(i):
+        counts["nodes"] += 1
+        knowledge_value = knowledge.partial(model)
+        if knowledge_value is False:
+            return True
+        query_value = query.partial(model)
+        if query_value is True:
+            return True
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+        # Knowledge base holds in every completion but query fails in one
+        if knowledge_value is True and query_value is False:
+            return False
+
+        # Both sentences can only be undecided with symbols left
+        p = symbols[i]
+        for value in (True, False):
+            model[p] = value
+            if not check_from(i + 1):
+                del model[p]
+                return False
+        del model[p]
+        return True
+
+    return check_from(0)
+
+
+def model_check(knowledge, query, method="enumerate", stats=None):
+    """
+    Checks if knowledge base entails query.
+
+    `method` chooses how: "enumerate" checks every model of the symbols
+    with compiled sentences, "tree" does the same by evaluating the
+    sentence objects, "prune" stops at partial models that already
+    decide the answer, "parallel" splits enumeration across a process
+    pool, "bitwise" evaluates blocks of models at once as bits of an
+    integer, and "sat" asks a SAT solver for a model of knowledge and
+    not query. For "tree" and "prune", if `stats` is a
+    dictionary the number of models visited, partial or complete, is
+    stored in it under "nodes".
+    """
+    if method == "prune":
+        return pruned_entails(knowledge, query, stats)
+    elif method == "parallel":
+        return parallel_entails(knowledge, query)
+    elif method == "sat":
+        return sat_entails(knowledge, query)
+    elif method == "bitwise":
+        return bitwise_entails(knowledge, query)
+    elif method == "enumerate":
+        return compiled_entails(knowledge, query)
+    elif method != "tree":
+        raise ValueError(f"unknown model checking method {method!r}")
+    counts = stats if stats is not None else {}
+    counts["nodes"] = 0
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
+        counts["nodes"] += 1
 
         # If model has an assignment for each symbol
         if not symbols:
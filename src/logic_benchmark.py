@@ -0,0 +1,76 @@
+import sys
+import timeit
+
+from logic import model_check
+from puzzle import (AKnave, AKnight, BKnave, BKnight, CKnave, CKnight,
+                    knowledge0, knowledge1, knowledge2, knowledge3)
+
+SYMBOLS = [AKnight, AKnave, BKnight, BKnave, CKnight, CKnave]
+PUZZLES = [
+    ("Puzzle 0", knowledge0),
+    ("Puzzle 1", knowledge1),
+    ("Puzzle 2", knowledge2),
+    ("Puzzle 3", knowledge3)
+]
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python logic_benchmark.py [repeats] [methods]")
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    methods = (sys.argv[2].split(",") if len(sys.argv) > 2
+               else ["tree", "prune", "enumerate", "bitwise", "sat"])
+
+    print(f"Seconds to check every symbol, best of 5 x {repeats} runs")
+    print(f"{'':10}" + "".join(f"{method:>12}" for method in methods))
+    for puzzle, knowledge in PUZZLES:
+        results = {}
+        row = f"{puzzle:10}"
+        for method in methods:
+            results[method] = solve(knowledge, method)
+            row += f"{benchmark(knowledge, method, repeats):12.5f}"
+        print(row)
+        if len(set(map(tuple, results.values()))) != 1:
+            sys.exit(f"Methods disagree on {puzzle}: {results}")
+
+    print("Models visited to check every symbol")
+    print(f"{'':10}{'tree':>12}{'prune':>12}")
+    for puzzle, knowledge in PUZZLES:
+        print(f"{puzzle:10}{visited(knowledge, 'tree'):12}"
+              f"{visited(knowledge, 'prune'):12}")
+
+
+def solve(knowledge, method):
+    """
+    Returns the symbols `knowledge` entails, checked with `method`.
+    """
+    return [
+        symbol.name for symbol in SYMBOLS
+        if model_check(knowledge, symbol, method=method)
+    ]
+
+
+def visited(knowledge, method):
+    """
+    Returns the number of models, partial or complete, `method`
+    visits to solve `knowledge`.
+    """
+    total = 0
+    for symbol in SYMBOLS:
+        stats = {}
+        model_check(knowledge, symbol, method=method, stats=stats)
+        total += stats["nodes"]
+    return total
+
+
+def benchmark(knowledge, method, repeats):
+    """
+    Returns the fastest time, out of five, to solve `knowledge`
+    `repeats` times with `method`.
+    """
+    timer = timeit.Timer(lambda: solve(knowledge, method))
+    return min(timer.repeat(repeat=5, number=repeats))
+
+
+if __name__ == "__main__":
+    main()
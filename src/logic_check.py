@@ -0,0 +1,148 @@
+import itertools
+import random
+import sys
+
+from logic import (And, Biconditional, Implication, IncrementalKB, Not, Or,
+                   Solver, Symbol, check_queries, model_check)
+
+SYMBOLS = [Symbol(name) for name in "ABCDEFG"]
+METHODS = ["enumerate", "prune", "bitwise", "sat"]
+QUERIES = 4
+DEPTH = 3
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python logic_check.py [cases] [seed]")
+    cases = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    rng = random.Random(seed)
+
+    for case in range(cases):
+        conjuncts = [random_sentence(rng, DEPTH)
+                     for _ in range(rng.randint(1, 4))]
+        queries = [random_sentence(rng, DEPTH - 1) for _ in range(QUERIES)]
+        problem = check_sentences(conjuncts, queries)
+        if problem is None:
+            problem = check_solver(rng)
+        if problem is not None:
+            sys.exit(f"Case {case} (seed {seed}): {problem}")
+    print(f"All {cases} cases agree with method \"tree\" and brute force")
+
+
+def random_sentence(rng, depth):
+    """
+    Returns a random sentence over SYMBOLS, nested at most `depth` deep.
+    """
+    if depth == 0 or rng.random() < 0.25:
+        return rng.choice(SYMBOLS)
+    kind = rng.randrange(5)
+    if kind == 0:
+        return Not(random_sentence(rng, depth - 1))
+    elif kind == 1:
+        return And(*(random_sentence(rng, depth - 1)
+                     for _ in range(rng.randint(1, 3))))
+    elif kind == 2:
+        return Or(*(random_sentence(rng, depth - 1)
+                    for _ in range(rng.randint(1, 3))))
+    elif kind == 3:
+        return Implication(random_sentence(rng, depth - 1),
+                           random_sentence(rng, depth - 1))
+    return Biconditional(random_sentence(rng, depth - 1),
+                         random_sentence(rng, depth - 1))
+
+
+def check_sentences(conjuncts, queries):
+    """
+    Checks every model checking method, `check_queries` and an
+    IncrementalKB built one conjunct at a time against method "tree".
+    Returns a description of the first disagreement, or None.
+    """
+    knowledge = And(*conjuncts)
+    for query in queries:
+        entailed = model_check(knowledge, query, method="tree")
+        for method in METHODS:
+            if model_check(knowledge, query, method=method) != entailed:
+                return (f"method {method!r} disagrees on whether "
+                        f"{knowledge.formula()} entails {query.formula()}")
+    expected = [outcome(knowledge, query) for query in queries]
+
+    for method in ("enumerate", "sat"):
+        outcomes = check_queries(knowledge, queries, method=method)
+        if outcomes != expected:
+            return (f"check_queries with {method!r} gives {outcomes} "
+                    f"instead of {expected} for {knowledge.formula()}")
+
+    incremental = IncrementalKB()
+    for conjunct in conjuncts:
+        incremental.add(conjunct)
+    outcomes = [incremental.check(query) for query in queries]
+    if outcomes != expected:
+        return (f"IncrementalKB gives {outcomes} instead of {expected} "
+                f"for {knowledge.formula()}")
+
+    # A query changed after it was checked must be checked afresh
+    query = And(queries[0])
+    incremental.check(query)
+    query.add(queries[1])
+    checked, expected = incremental.check(query), outcome(knowledge, query)
+    if checked != expected:
+        return (f"IncrementalKB gives {checked} for {query.formula()} "
+                f"after it changed, instead of {expected}, for "
+                f"{knowledge.formula()}")
+    return None
+
+
+def outcome(knowledge, query):
+    """
+    Returns "entailed", "contradicted" or "unknown" for `query` given
+    `knowledge`, checked with method "tree".
+    """
+    if model_check(knowledge, query, method="tree"):
+        return "entailed"
+    if model_check(knowledge, Not(query), method="tree"):
+        return "contradicted"
+    return "unknown"
+
+
+def check_solver(rng):
+    """
+    Solves random clauses under several random assumptions with one
+    Solver, checking each answer against trying every assignment and
+    each model against the clauses. Returns a description of the first
+    disagreement, or None.
+    """
+    num_vars = rng.randint(1, 8)
+    clauses = [
+        [rng.choice((1, -1)) * rng.randint(1, num_vars)
+         for _ in range(rng.randint(1, 4))]
+        for _ in range(rng.randint(1, 4 * num_vars))
+    ]
+    solver = Solver()
+    for clause in clauses:
+        solver.add_clause(clause)
+
+    for _ in range(QUERIES):
+        assumptions = [rng.choice((1, -1)) * rng.randint(1, num_vars)
+                       for _ in range(rng.randint(0, 3))]
+        expected = any(
+            all(any(values[abs(literal) - 1] == (literal > 0)
+                    for literal in clause)
+                for clause in clauses + [[literal] for literal in assumptions])
+            for values in itertools.product((False, True), repeat=num_vars)
+        )
+        if solver.solve(assumptions) != expected:
+            return (f"Solver says {not expected} for clauses {clauses} "
+                    f"under assumptions {assumptions}")
+        if expected and not all(
+            any(solver.model[abs(literal)] == (literal > 0)
+                for literal in clause)
+            for clause in clauses + [[literal] for literal in assumptions]
+        ):
+            return (f"Solver model {solver.model} does not satisfy clauses "
+                    f"{clauses} under assumptions {assumptions}")
+    return None
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,20 @@ import os
 import random
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pagerank_cache
 
 DAMPING = 0.85
 SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python pagerank.py corpus [workers]")
+    workers = int(sys.argv[2]) if len(sys.argv) == 3 else 1
+    corpus = pagerank_cache.cached_corpus(sys.argv[1])
+    ranks = walk_pagerank(corpus, DAMPING, SAMPLES, workers)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
@@ -97,6 +101,61 @@ def sample_pagerank(corpus, damping_factor, n):
         prob_distribution = transition_model(corpus, page, damping_factor)
     return pageranks
 
+def walk_pagerank(corpus, damping_factor, n, workers=1):
+    """
+    Return PageRank values for each page by sampling `n` pages like
+    `sample_pagerank`, but taking each step in constant time: first
+    decide between following a link and jumping to a random page, then
+    pick uniformly by index. The samples are split between independent
+    walks in `workers` processes, and their counts are merged.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    pages = list(corpus)
+    numbers = {page: i for i, page in enumerate(pages)}
+    links = tuple(
+        tuple(numbers[link] for link in corpus[page]) for page in pages
+    )
+    lengths = [n // workers + (i < n % workers) for i in range(workers)]
+    seeds = [random.getrandbits(64) for _ in range(workers)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                random_walk, [links] * workers, [damping_factor] * workers,
+                lengths, seeds
+            ))
+    else:
+        results = [random_walk(links, damping_factor, n, seeds[0])]
+
+    visits = [sum(counts) for counts in zip(*results)]
+    return {page: visits[i] / n for i, page in enumerate(pages)}
+
+
+def random_walk(links, damping_factor, n, seed=None):
+    """
+    Return how many of `n` steps a random surfer, starting on a random
+    page, spends on each page. `links` lists the numbers of the pages
+    each page links to.
+    """
+    generator = random.Random(seed)
+    uniform = generator.random
+    num_pages = len(links)
+    counts = [0] * num_pages
+    page = int(uniform() * num_pages)
+    for _ in range(n):
+        counts[page] += 1
+        targets = links[page]
+
+        # Pages without links always jump to a random page
+        if targets and uniform() < damping_factor:
+            page = targets[int(uniform() * len(targets))]
+        else:
+            page = int(uniform() * num_pages)
+    return counts
+
+
 def iterate_pagerank(corpus, damping_factor):
     """
     Return PageRank values for each page by iteratively updating
@@ -0,0 +1,205 @@
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from pagerank_crawl import CHUNK_SIZE, page_links
+from sectioned_file import read_sections, write_sections
+
+CACHE_NAME = "pagerank.cache"
+
+MAGIC = b"PRCACHE2"
+SECTIONS = (
+    "pages", "sizes", "mtimes", "link_offsets", "links", "sources",
+    "targets"
+)
+
+
+def main():
+
+    # Ranking needs NumPy and SciPy, which pagerank.py loads corpora without
+    import numpy as np
+    from pagerank import DAMPING
+    from pagerank_sparse import power_iteration, transition_matrix
+
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python pagerank_cache.py corpus [workers]")
+    workers = int(sys.argv[2]) if len(sys.argv) == 3 else 1
+    pages, sources, targets, stats = cached_crawl(sys.argv[1], workers)
+    print(f"Loaded {stats['files']} files in {stats['seconds']:.2f}s, "
+          f"parsed {stats['parsed']} and reused {stats['reused']}")
+
+    matrix, dangling = transition_matrix(
+        len(pages), np.frombuffer(sources, dtype=np.int32),
+        np.frombuffer(targets, dtype=np.int32)
+    )
+    ranks = power_iteration(matrix, dangling, DAMPING)
+    print("PageRank Results from Sparse Iteration")
+    for page, rank in zip(pages, ranks):
+        print(f"  {page}: {rank:.4f}")
+
+
+def cached_crawl(directory, workers=1):
+    """
+    Parse a directory of HTML pages for links to other pages, like
+    `pagerank_crawl.crawl_edges`, but only parse the files whose size or
+    modification time changed since the cache in `directory` was saved,
+    then save it again. If nothing changed, the edge list is memory-mapped
+    from the cache without parsing anything.
+
+    Return the sorted list of pages, arrays of the source and target
+    number of every link, sorted by source, and a dictionary counting the
+    files, those parsed and reused, and the seconds taken.
+    """
+    start = time.perf_counter()
+    entries = sorted(
+        (entry for entry in os.scandir(directory)
+         if entry.name.endswith(".html")),
+        key=lambda entry: entry.name
+    )
+    pages = [entry.name for entry in entries]
+    sizes = array("q", (entry.stat().st_size for entry in entries))
+    mtimes = array("q", (entry.stat().st_mtime_ns for entry in entries))
+
+    cache = load_cache(directory)
+    if (cache is not None and cache["pages"] == pages
+            and cache["sizes"] == sizes and cache["mtimes"] == mtimes):
+        sources, targets = cache["sources"], cache["targets"]
+        parsed = 0
+    else:
+        links, parsed = update_links(directory, pages, sizes, mtimes,
+                                     cache, workers)
+        sources, targets = resolve_links(pages, links)
+
+        # A corpus that can't be written to is still crawled, just uncached
+        try:
+            save_cache(directory, pages, sizes, mtimes, links, sources,
+                       targets)
+        except OSError:
+            pass
+
+    stats = {
+        "files": len(pages),
+        "parsed": parsed,
+        "reused": len(pages) - parsed,
+        "seconds": time.perf_counter() - start
+    }
+    return pages, sources, targets, stats
+
+
+def cached_corpus(directory, workers=1):
+    """
+    Return a corpus dictionary like `pagerank.crawl`, mapping each page
+    to the set of other pages in the corpus it links to, using the cache.
+    """
+    pages, sources, targets, stats = cached_crawl(directory, workers)
+    corpus = {page: set() for page in pages}
+    for source, target in zip(sources, targets):
+        corpus[pages[source]].add(pages[target])
+    return corpus
+
+
+def update_links(directory, pages, sizes, mtimes, cache, workers=1):
+    """
+    Return a list of the sorted link targets of each of `pages`, reusing
+    those in `cache` for files of the same size and modification time and
+    parsing the rest in `workers` processes, and the number parsed.
+    """
+    links = [None] * len(pages)
+    if cache is not None:
+        cached = {page: i for i, page in enumerate(cache["pages"])}
+        offsets = cache["link_offsets"]
+        for i, page in enumerate(pages):
+            j = cached.get(page)
+            if (j is not None and cache["sizes"][j] == sizes[i]
+                    and cache["mtimes"][j] == mtimes[i]):
+                links[i] = cache["links"][offsets[j]:offsets[j + 1]]
+
+    changed = [i for i, hrefs in enumerate(links) if hrefs is None]
+    chunks = [
+        [os.path.join(directory, pages[i])
+         for i in changed[first:first + CHUNK_SIZE]]
+        for first in range(0, len(changed), CHUNK_SIZE)
+    ]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(parse_pages, chunks))
+    else:
+        results = [parse_pages(chunk) for chunk in chunks]
+    for i, hrefs in zip(changed, (
+        hrefs for result in results for hrefs in result
+    )):
+        links[i] = hrefs
+    return links, len(changed)
+
+
+def parse_pages(paths):
+    """
+    Return a list of the sorted link targets of each HTML file in `paths`.
+    """
+    return [sorted(page_links(path)[0]) for path in paths]
+
+
+def resolve_links(pages, links):
+    """
+    Return arrays of the source and target numbers of the links in
+    `links` to other pages among `pages`, sorted by source and target.
+    """
+    numbers = {page: i for i, page in enumerate(pages)}
+    sources = array("i")
+    targets = array("i")
+    for source, hrefs in enumerate(links):
+        for target in sorted({
+            numbers[link] for link in hrefs if link in numbers
+        } - {source}):
+            sources.append(source)
+            targets.append(target)
+    return sources, targets
+
+
+def save_cache(directory, pages, sizes, mtimes, links, sources, targets):
+    """
+    Writes the pages, their sizes and modification times, the raw link
+    targets of each and the resolved edge list to the cache file in
+    `directory`.
+    """
+    link_offsets = array("q", [0])
+    for hrefs in links:
+        link_offsets.append(link_offsets[-1] + len(hrefs))
+    sections = {
+        "pages": pages,
+        "sizes": sizes,
+        "mtimes": mtimes,
+        "link_offsets": link_offsets,
+        "links": [link for hrefs in links for link in hrefs],
+        "sources": sources,
+        "targets": targets
+    }
+
+    write_sections(os.path.join(directory, CACHE_NAME), MAGIC, b"",
+                   sections)
+
+
+def load_cache(directory):
+    """
+    Loads the cache file in `directory`. Returns a dictionary of its
+    sections, with the page and link lists decoded and the rest as
+    read-only views into the memory-mapped file, or None if there is no
+    usable cache.
+    """
+    sections = read_sections(os.path.join(directory, CACHE_NAME), MAGIC, b"")
+    if sections is None or any(name not in sections for name in SECTIONS):
+        return None
+    num_pages = len(sections["pages"])
+    if (len(sections["sizes"]) != num_pages
+            or len(sections["mtimes"]) != num_pages
+            or len(sections["link_offsets"]) != num_pages + 1
+            or sections["link_offsets"][-1] != len(sections["links"])
+            or len(sections["sources"]) != len(sections["targets"])):
+        return None
+    return sections
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import random
+import sys
+import tempfile
+
+from pagerank import crawl
+from pagerank_crawl import LINK, crawl_edges, page_links
+
+PAGES = 8
+
+# Pieces of HTML that cut-off tags are made of, including "<" and ">"
+# inside attribute values
+PIECES = [
+    "<a ", "<a\n", "<a", "<ab ", "<", ">", "\"", "href=\"", "href=",
+    " title=\"a<b\" ", " title=\"a>b\" ", "<p>", "</a>", "text", "é",
+    "<a title=\"a<b\" href=\"1.html\">", "<a href=\"x>y\">"
+]
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python pagerank_check.py [cases] [seed]")
+    cases = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    rng = random.Random(seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for case in range(cases):
+            pages = [random_page(rng) for _ in range(PAGES)]
+            for i, page in enumerate(pages):
+                with open(os.path.join(directory, f"{i}.html"), "wb") as f:
+                    f.write(page)
+            problem = check_pages(directory, pages)
+            if problem is not None:
+                sys.exit(f"Case {case} (seed {seed}): {problem}")
+    print(f"All {cases} cases agree with pagerank.crawl at every block size")
+
+
+def random_page(rng):
+    """
+    Returns the bytes of a random page mixing PIECES with links to
+    the other pages.
+    """
+    pieces = []
+    for _ in range(rng.randint(0, 30)):
+        if rng.random() < 0.2:
+            pieces.append(f"<a href=\"{rng.randrange(PAGES + 1)}.html\">")
+        else:
+            pieces.append(rng.choice(PIECES))
+    return "".join(pieces).encode()
+
+
+def check_pages(directory, pages):
+    """
+    Checks that `page_links` finds the links the whole-file regex does
+    in each of `pages` at every block size, and that `crawl_edges` finds
+    the same links as `pagerank.crawl`. Returns a description of the
+    first disagreement, or None.
+    """
+    for i, page in enumerate(pages):
+        expected = {
+            link.decode("utf-8", "replace") for link in LINK.findall(page)
+        }
+        path = os.path.join(directory, f"{i}.html")
+        for block_size in range(1, len(page) + 2):
+            links, size = page_links(path, block_size)
+            if links != expected or size != len(page):
+                return (f"blocks of {block_size} give {links} instead of "
+                        f"{expected} for {page!r}")
+
+    names, sources, targets, stats = crawl_edges(directory)
+    edges = {name: set() for name in names}
+    for source, target in zip(sources, targets):
+        edges[names[source]].add(names[target])
+    corpus = crawl(directory)
+    if edges != corpus:
+        return f"crawl_edges gives {edges} instead of {corpus}"
+    return None
+
+
+if __name__ == "__main__":
+    main()
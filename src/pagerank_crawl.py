@@ -0,0 +1,169 @@
+import os
+import re
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+LINK = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Bytes read from a file at a time, and files handed to a worker at once
+BLOCK_SIZE = 1 << 20
+CHUNK_SIZE = 256
+
+# Page numbers of the corpus being crawled, set by init_worker
+numbers = None
+
+
+def main():
+
+    # Ranking needs NumPy and SciPy, which crawling does not
+    import numpy as np
+    from pagerank import DAMPING
+    from pagerank_sparse import power_iteration, transition_matrix
+
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python pagerank_crawl.py corpus [workers]")
+    workers = int(sys.argv[2]) if len(sys.argv) == 3 else 1
+    pages, sources, targets, stats = crawl_edges(sys.argv[1], workers)
+    print(f"Crawled {stats['files']} files, {stats['bytes'] / 1e6:.1f} MB "
+          f"in {stats['seconds']:.2f}s ({stats['files_per_second']:.0f} "
+          f"files/s, {stats['mb_per_second']:.1f} MB/s)")
+    print(f"{len(pages)} pages, {len(sources)} links")
+
+    matrix, dangling = transition_matrix(
+        len(pages), np.frombuffer(sources, dtype=np.int32),
+        np.frombuffer(targets, dtype=np.int32)
+    )
+    ranks = power_iteration(matrix, dangling, DAMPING)
+    print("Highest PageRank")
+    for i in np.argsort(ranks)[::-1][:10]:
+        print(f"  {pages[i]}: {ranks[i]:.4f}")
+
+
+def crawl_edges(directory, workers=1, chunk_size=CHUNK_SIZE):
+    """
+    Parse a directory of HTML pages for links to other pages, like
+    `pagerank.crawl`, reading files in blocks in `workers` processes.
+
+    Return the sorted list of pages, so that a page's number is its
+    index, arrays of the source and target number of every link, sorted
+    by source, and a dictionary of throughput statistics.
+    """
+    start = time.perf_counter()
+    pages = sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html")
+    )
+    page_numbers = {page: i for i, page in enumerate(pages)}
+    chunks = [
+        [(i, os.path.join(directory, page))
+         for i, page in enumerate(pages[first:first + chunk_size], first)]
+        for first in range(0, len(pages), chunk_size)
+    ]
+
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=init_worker,
+                                 initargs=(page_numbers,)) as executor:
+            results = list(executor.map(crawl_chunk, chunks))
+    else:
+        init_worker(page_numbers)
+        results = [crawl_chunk(chunk) for chunk in chunks]
+
+    sources = array("i")
+    targets = array("i")
+    size = 0
+    for chunk_sources, chunk_targets, chunk_size in results:
+        sources.extend(chunk_sources)
+        targets.extend(chunk_targets)
+        size += chunk_size
+
+    seconds = time.perf_counter() - start
+    stats = {
+        "files": len(pages),
+        "bytes": size,
+        "seconds": seconds,
+        "files_per_second": len(pages) / seconds if seconds else 0,
+        "mb_per_second": size / 1e6 / seconds if seconds else 0
+    }
+    return pages, sources, targets, stats
+
+
+def init_worker(page_numbers):
+    """
+    Sets the page numbers links are resolved against in a pool worker.
+    """
+    global numbers
+    numbers = page_numbers
+
+
+def crawl_chunk(chunk):
+    """
+    Return arrays of the source and target numbers of the links in the
+    (number, path) pairs of `chunk`, and the number of bytes read.
+    """
+    sources = array("i")
+    targets = array("i")
+    size = 0
+    for source, path in chunk:
+        links, file_size = page_links(path)
+        size += file_size
+        for target in sorted(
+            numbers[link] for link in links
+            if link in numbers and numbers[link] != source
+        ):
+            sources.append(source)
+            targets.append(target)
+    return sources, targets, size
+
+
+def page_links(path, block_size=BLOCK_SIZE):
+    """
+    Return the set of link targets in the HTML file at `path`, reading
+    it in blocks of `block_size` bytes, and the number of bytes read.
+    """
+    links = set()
+    size = 0
+    pending = b""
+    with open(path, "rb") as f:
+        block = f.read(block_size)
+        while block:
+            size += len(block)
+            buffer = pending + block
+            block = f.read(block_size)
+
+            # Links found are complete, but if there is more to read, a
+            # later tag may be cut off
+            end = 0
+            for match in LINK.finditer(buffer):
+                links.add(match.group(1).decode("utf-8", "replace"))
+                end = match.end()
+            if block:
+                pending = buffer[unfinished_link(buffer, end):]
+    return links, size
+
+
+def unfinished_link(buffer, start):
+    """
+    Return where the first link tag at or after `start` in `buffer` that
+    more bytes could still complete begins, or the length of `buffer`.
+
+    `start` must be past every link found in `buffer`. A tag can't be
+    completed once a ">" ends it before an href, which may be inside an
+    attribute value, but an href it has before that is only waiting for
+    its closing quote.
+    """
+    position = buffer.find(b"<", start)
+    while position != -1:
+        name = buffer[position + 1:position + 3]
+        if name in (b"", b"a") or (name[:1] == b"a" and name[1:].isspace()):
+            close = buffer.find(b">", position)
+            if close == -1 or buffer.find(b'href="', position, close) != -1:
+                return position
+        position = buffer.find(b"<", position + 1)
+    return len(buffer)
+
+
+if __name__ == "__main__":
+    main()
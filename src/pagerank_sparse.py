@@ -0,0 +1,224 @@
+import sys
+
+import numpy as np
+from scipy import sparse, stats
+
+from pagerank import DAMPING, crawl
+
+TOLERANCE = 1e-10
+MAX_ITERATIONS = 1000
+STEPS = 10_000_000
+WALKERS = 10_000
+GROUPS = 16
+BURN_IN = 50
+BATCH_VISITS = 2 ** 20
+CONFIDENCE = 0.95
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python pagerank_sparse.py corpus [tolerance]")
+    tolerance = float(sys.argv[2]) if len(sys.argv) == 3 else TOLERANCE
+    corpus = crawl(sys.argv[1])
+    ranks = sparse_pagerank(corpus, DAMPING, tolerance)
+    print("PageRank Results from Sparse Iteration")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+    estimates = monte_carlo_pagerank(corpus, DAMPING, STEPS)
+    print(f"PageRank Results from Monte Carlo (n = {STEPS}, "
+          f"{CONFIDENCE:.0%} confidence)")
+    for page in sorted(estimates):
+        estimate, margin = estimates[page]
+        print(f"  {page}: {estimate:.4f} ± {margin:.4f}")
+
+
+def sparse_pagerank(corpus, damping_factor, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page by power iteration over a
+    sparse transition matrix, until the values change by no more than
+    `tolerance` in total.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    pages, sources, targets = corpus_edges(corpus)
+    matrix, dangling = transition_matrix(len(pages), sources, targets)
+    ranks = power_iteration(matrix, dangling, damping_factor, tolerance)
+    return dict(zip(pages, ranks.tolist()))
+
+
+def monte_carlo_pagerank(corpus, damping_factor, steps=STEPS,
+                         walkers=WALKERS, seed=None):
+    """
+    Return PageRank estimates for each page from `steps` random surfer
+    steps in total, taken by `walkers` surfers moving at once.
+
+    Return a dictionary where keys are page names, and values are pairs
+    of the estimated PageRank value and the margin of its confidence
+    interval.
+    """
+    pages, sources, targets = corpus_edges(corpus)
+    offsets, links = link_lists(len(pages), sources, targets)
+    estimates, margins = random_walks(
+        offsets, links, damping_factor, steps, walkers,
+        rng=np.random.default_rng(seed)
+    )
+    return {
+        page: (estimate, margin)
+        for page, estimate, margin in zip(pages, estimates.tolist(),
+                                          margins.tolist())
+    }
+
+
+def link_lists(num_pages, sources, targets):
+    """
+    Return CSR arrays of every page's links: the targets of page i's
+    links are `links[offsets[i]:offsets[i + 1]]`.
+    """
+    order = np.argsort(sources, kind="stable")
+    offsets = np.zeros(num_pages + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_pages), out=offsets[1:])
+    return offsets, targets[order]
+
+
+def random_walks(offsets, links, damping_factor, steps, walkers=WALKERS,
+                 groups=GROUPS, confidence=CONFIDENCE, burn_in=BURN_IN,
+                 rng=None):
+    """
+    Move `walkers` random surfers, starting on random pages, together as
+    arrays over the CSR link lists until they have taken about `steps`
+    steps between them, counting their visits to each page. Each walker
+    first takes `burn_in` uncounted steps to forget where it started.
+
+    Return arrays of each page's estimated PageRank and the margin of
+    its `confidence` interval. The walkers are split into `groups`
+    independent groups whose estimates give the interval, at most one
+    per walker. Raises ValueError if that leaves fewer than two groups.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    num_pages = len(offsets) - 1
+    degrees = np.diff(offsets)
+    walkers = min(walkers, steps)
+    length = steps // walkers
+    groups = min(groups, walkers)
+    if groups < 2:
+        raise ValueError("margins need at least two groups of walkers")
+
+    # Visits are counted per group by offsetting each group's pages.
+    # They are buffered for about BATCH_VISITS visits, then counted all
+    # at once if there are few enough pages for that to be cheap, or
+    # else added up for just the pages visited.
+    group_offsets = (np.arange(walkers) % groups) * num_pages
+    batch = max(1, BATCH_VISITS // walkers)
+    visited = np.empty((batch, walkers), dtype=np.int64)
+    cells = groups * num_pages
+    counts = np.zeros(cells, dtype=np.int32 if length * walkers < 2 ** 31
+                      else np.int64)
+
+    # Walkers not following a link may look past the last link
+    padded = np.append(links, 0)
+    positions = rng.integers(num_pages, size=walkers)
+    for step in range(-burn_in, length):
+        if step >= 0:
+            visited[step % batch] = positions + group_offsets
+            if step % batch == batch - 1 or step == length - 1:
+                batch_visited = visited[:step % batch + 1].ravel()
+                if cells <= visited.size:
+                    counts += np.bincount(batch_visited, minlength=cells)
+                else:
+                    cells_visited, visits = np.unique(batch_visited,
+                                                      return_counts=True)
+                    counts[cells_visited] += visits
+
+        # Below the damping factor, the same draw scaled up is uniform,
+        # so it also picks the link to follow. Pages without links
+        # always jump to a random page.
+        draws = rng.random(walkers)
+        position_degrees = degrees[positions]
+        follow = (draws < damping_factor) & (position_degrees > 0)
+        choices = (draws / damping_factor * position_degrees).astype(np.int64)
+        indices = np.minimum(offsets[positions] + choices, len(links))
+        targets = padded[indices]
+        positions = np.where(follow, targets,
+                             rng.integers(num_pages, size=walkers))
+
+    # Each group's estimates are worked out in turn, so that only a few
+    # arrays as large as the number of pages are needed at once
+    counts = counts.reshape(groups, num_pages)
+    sizes = np.bincount(np.arange(walkers) % groups, minlength=groups)
+    estimates = np.zeros(num_pages)
+    group_mean = np.zeros(num_pages)
+    for group in range(groups):
+        estimates += counts[group]
+        group_mean += counts[group] / (sizes[group] * length)
+    estimates /= walkers * length
+    group_mean /= groups
+    squares = np.zeros(num_pages)
+    for group in range(groups):
+        squares += (counts[group] / (sizes[group] * length) - group_mean) ** 2
+    quantile = stats.t.ppf((1 + confidence) / 2, groups - 1)
+    margins = quantile * np.sqrt(squares / (groups - 1) / groups)
+    return estimates, margins
+
+
+def corpus_edges(corpus):
+    """
+    Number the pages of `corpus` in sorted order. Return the list of
+    pages, and arrays of the source and target number of every link.
+    """
+    pages = sorted(corpus)
+    numbers = {page: i for i, page in enumerate(pages)}
+    count = sum(len(links) for links in corpus.values())
+    sources = np.fromiter(
+        (numbers[page] for page in pages for link in corpus[page]),
+        dtype=np.int64, count=count
+    )
+    targets = np.fromiter(
+        (numbers[link] for page in pages for link in corpus[page]),
+        dtype=np.int64, count=count
+    )
+    return pages, sources, targets
+
+
+def transition_matrix(num_pages, sources, targets):
+    """
+    Return the column-stochastic CSR matrix whose entry (i, j) is the
+    chance of following a link from page j to page i, and a boolean
+    array marking the pages with no links, whose columns are empty.
+    Repeated links from a page to the same target count separately.
+    """
+    degrees = np.bincount(sources, minlength=num_pages)
+    weights = 1 / degrees[sources]
+    matrix = sparse.csr_matrix(
+        (weights, (targets, sources)), shape=(num_pages, num_pages)
+    )
+    return matrix, degrees == 0
+
+
+def power_iteration(matrix, dangling, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS):
+    """
+    Return the array of PageRank values for a transition matrix from
+    `transition_matrix`, iterating until the values change by no more
+    than `tolerance` in total. Pages with no links are treated as
+    linking to every page, including themselves.
+    """
+    num_pages = matrix.shape[0]
+    ranks = np.full(num_pages, 1 / num_pages)
+    for _ in range(max_iterations):
+
+        # Surfers on pages with no links jump anywhere, like random jumps
+        jump = ((1 - damping_factor)
+                + damping_factor * ranks[dangling].sum()) / num_pages
+        new_ranks = damping_factor * (matrix @ ranks) + jump
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if change <= tolerance:
+            break
+    return ranks / ranks.sum()
+
+
+if __name__ == "__main__":
+    main()
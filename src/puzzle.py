@@ -70,8 +70,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            outcomes = check_queries(knowledge, symbols)
+            for symbol, outcome in zip(symbols, outcomes):
+                if outcome == "entailed":
                     print(f"    {symbol}")
 
 
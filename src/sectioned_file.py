@@ -0,0 +1,127 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+BYTEORDER = sys.byteorder.encode().ljust(8, b"\0")
+
+# Magic, byte order, key, number of sections
+HEADER = struct.Struct("=8s8s32sI")
+
+# Section name, item typecode, byte offset, number of items
+SECTION = struct.Struct("=16s1sqq")
+
+# Typecode of sections holding a list of strings
+STRINGS = "s"
+
+
+def write_sections(path, magic, key, sections):
+    """
+    Atomically writes a file of named sections to `path`, with the 8-byte
+    `magic` and up to 32 bytes of `key` in its header. `sections` maps
+    names to arrays, or to lists of strings.
+    """
+    table = []
+    for name, data in sections.items():
+        if isinstance(data, array):
+            table.append((name, data.typecode, len(data), [data]))
+        else:
+            table.append((name, STRINGS, len(data), pack_strings(data)))
+
+    # Lay out each section, and each part of it, on an 8-byte boundary
+    offset = HEADER.size + SECTION.size * len(table)
+    layout = []
+    for name, typecode, length, parts in table:
+        offset += -offset % 8
+        layout.append((name, typecode, length, parts, offset))
+        for part in parts:
+            offset += part.itemsize * len(part)
+            offset += -offset % 8
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(magic, BYTEORDER, key, len(layout)))
+            for name, typecode, length, parts, offset in layout:
+                f.write(SECTION.pack(name.encode(), typecode.encode(),
+                                     offset, length))
+            for name, typecode, length, parts, offset in layout:
+                for part in parts:
+                    f.write(b"\0" * (-f.tell() % 8))
+                    part.tofile(f)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def read_sections(path, magic, key):
+    """
+    Memory-maps the file of sections at `path`. Returns a dictionary
+    mapping each section's name to a read-only view of its array, or to
+    its list of strings, or None if the file is missing, damaged, or has
+    a different magic, byte order or key.
+    """
+    try:
+        with open(path, "rb") as f:
+            contents = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        stored_magic, byteorder, stored_key, count = HEADER.unpack_from(
+            contents, 0
+        )
+        if (stored_magic != magic or byteorder != BYTEORDER
+                or stored_key != key.ljust(32, b"\0")):
+            return None
+        view = memoryview(contents)
+        sections = {}
+        for i in range(count):
+            name, typecode, offset, length = SECTION.unpack_from(
+                contents, HEADER.size + i * SECTION.size
+            )
+            name = name.rstrip(b"\0").decode()
+            typecode = typecode.decode()
+            if typecode == STRINGS:
+                sections[name] = unpack_strings(view, offset, length)
+            else:
+                size = array(typecode).itemsize
+                if offset + size * length > len(contents):
+                    return None
+                data = view[offset:offset + size * length]
+                sections[name] = data.cast(typecode)
+    except (OSError, struct.error, ValueError, TypeError,
+            UnicodeDecodeError):
+        return None
+    return sections
+
+
+def pack_strings(strings):
+    """
+    Returns the parts a list of strings is stored as: the number of
+    bytes of text, the character offset where each string starts and
+    one past where the last ends, and the UTF-8 text of all of them
+    joined, so strings may contain any character.
+    """
+    offsets = array("q", [0])
+    for string in strings:
+        offsets.append(offsets[-1] + len(string))
+    text = array("B", "".join(strings).encode("utf-8", "surrogateescape"))
+    return [array("q", [len(text)]), offsets, text]
+
+
+def unpack_strings(view, offset, length):
+    """
+    Returns the list of `length` strings stored at `offset` in `view`.
+    """
+    size = view[offset:offset + 8].cast("q")[0]
+    start = offset + 8 * (length + 2)
+    if start + size > len(view):
+        raise ValueError("strings run past the end of the file")
+    offsets = view[offset + 8:start].cast("q")
+    text = bytes(view[start:start + size]).decode("utf-8", "surrogateescape")
+    if offsets[length] != len(text):
+        raise ValueError("string offsets do not match the text")
+    return [text[offsets[i]:offsets[i + 1]] for i in range(length)]